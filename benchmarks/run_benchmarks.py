@@ -0,0 +1,197 @@
+"""
+Reproducible benchmarks for every sub-command over synthetic media.
+
+Test media is generated locally with lavfi testsrc2/sine (deterministic for a given ffmpeg build)
+and cached under <cache>/bench_media. Each case runs the real CLI in a subprocess with --metrics,
+records wall time, throughput (source seconds per wall second) and peak ffmpeg RSS, and is compared
+against benchmarks/baseline.json.
+
+Usage:
+    python benchmarks/run_benchmarks.py                 # run and compare against the baseline
+    python benchmarks/run_benchmarks.py --update-baseline
+    python benchmarks/run_benchmarks.py --only effects
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.cache import cache_dir  # noqa: E402
+
+BASELINE_FILE = os.path.join(ROOT, "benchmarks", "baseline.json")
+# A case regresses when it is this much slower (or uses this much more memory) than the baseline.
+WALL_THRESHOLD = 0.15
+RSS_THRESHOLD = 0.20
+
+# name -> (width, height, seconds)
+VIDEO_SPECS: Dict[str, Tuple[int, int, int]] = {
+    "360p_10s": (640, 360, 10),
+    "720p_30s": (1280, 720, 30),
+    "1080p_30s": (1920, 1080, 30),
+}
+
+
+def make_video(name: str) -> str:
+    width, height, seconds = VIDEO_SPECS[name]
+    path = os.path.join(cache_dir("bench_media"), f"{name}.mp4")
+    if not os.path.exists(path):
+        subprocess.run([
+            "ffmpeg", "-y", "-v", "error",
+            "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate=30:duration={seconds}",
+            "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={seconds}",
+            "-c:v", "libx264", "-preset", "veryfast", "-g", "60", "-pix_fmt", "yuv420p",
+            "-c:a", "aac", "-shortest", path
+        ], check=True)
+    return path
+
+
+def make_audio(name: str, seconds: int, frequency: int) -> str:
+    path = os.path.join(cache_dir("bench_media"), f"{name}.mp3")
+    if not os.path.exists(path):
+        subprocess.run([
+            "ffmpeg", "-y", "-v", "error",
+            "-f", "lavfi", "-i", f"sine=frequency={frequency}:sample_rate=48000:duration={seconds}",
+            "-c:a", "libmp3lame", path
+        ], check=True)
+    return path
+
+
+Case = Tuple[str, float, Callable[[], List[str]]]
+
+
+def build_cases(out_dir: str) -> List[Case]:
+    """
+    Return (case name, source seconds, argv builder) for every benchmark case.
+    Media is generated when a case's argv is built, so --only never renders media it does not use.
+    """
+    cases: List[Case] = []
+    for spec in ("360p_10s", "1080p_30s"):
+        cases.append((f"compress/{spec}", VIDEO_SPECS[spec][2],
+                      lambda spec=spec: ["compress", make_video(spec), os.path.join(out_dir, f"compress_{spec}.mp4"),
+                                         "--size", "2", "--preset", "ultrafast"]))
+
+    effects: List[str] = []
+    for i in range(30):
+        effects += ["--effect", str(i), str(i + 0.5), "gblur"]
+    for backend in ("concat", "linear"):
+        cases.append((f"effects/30seg/{backend}", 30,
+                      lambda backend=backend: ["effects", make_video("720p_30s"),
+                                               os.path.join(out_dir, f"effects_{backend}.mp4"),
+                                               "--backend", backend] + effects))
+
+    segments: List[str] = []
+    for i in range(20):
+        segments += ["--segment", str(i * 1.5), str(i * 1.5 + 1)]
+    cases.append(("split/20cuts", 30,
+                  lambda: ["split", make_video("720p_30s"), os.path.join(out_dir, "split")] + segments))
+    cases.append(("split/20cuts/single-pass", 30,
+                  lambda: ["split", make_video("720p_30s"), os.path.join(out_dir, "split_sp"),
+                           "--single-pass"] + segments))
+
+    def mix_argv() -> List[str]:
+        cues: List[str] = []
+        for i in range(20):
+            cues += ["--mix", str(i * 1.5), make_audio(f"cue_{i}", 1, 220 + 20 * i)]
+        return ["mix", make_video("720p_30s"), os.path.join(out_dir, "mix.mp4")] + cues
+
+    cases.append(("mix/20cues", 30, mix_argv))
+    cases.append(("audioprocess/loop", 120,
+                  lambda: ["audioprocess", make_audio("song_120s", 120, 330), os.path.join(out_dir, "loop.mp3"),
+                           "--cut-duration", "30", "--loop-start", "30", "--loop-end", "34",
+                           "--loop-total", "90"]))
+    return cases
+
+
+def run_case(argv: List[str], source_seconds: float) -> Dict[str, Any]:
+    """Run one case cold: a fresh cache dir keeps probe, render and x265 stats caches from skewing timings."""
+    with tempfile.NamedTemporaryFile(suffix=".jsonl", delete=False) as f:
+        metrics_file = f.name
+    with tempfile.TemporaryDirectory(prefix="ffmpeg_toy_bench_cache_") as case_cache:
+        env = dict(os.environ, FFMPEG_TOY_CACHE=case_cache)
+        start = time.monotonic()
+        result = subprocess.run([sys.executable, os.path.join(ROOT, "ffmpeg_toy.py"), "--metrics", metrics_file]
+                                + argv, cwd=case_cache, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        wall = time.monotonic() - start
+    with open(metrics_file, "r", encoding="utf-8") as f:
+        stages = [json.loads(line) for line in f if line.strip()]
+    os.remove(metrics_file)
+    return {
+        "ok": result.returncode == 0,
+        "wall_s": round(wall, 3),
+        "throughput_x": round(source_seconds / wall, 3) if wall > 0 else None,
+        "peak_rss_kib": max((s.get("peak_rss_kib") or 0 for s in stages), default=0),
+        "stages": len(stages),
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]]) -> List[str]:
+    regressions: List[str] = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if res["wall_s"] > base["wall_s"] * (1 + WALL_THRESHOLD):
+            regressions.append(f"{name}: wall {base['wall_s']}s -> {res['wall_s']}s")
+        if base["peak_rss_kib"] and res["peak_rss_kib"] > base["peak_rss_kib"] * (1 + RSS_THRESHOLD):
+            regressions.append(f"{name}: peak RSS {base['peak_rss_kib']} -> {res['peak_rss_kib']} KiB")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ffmpeg_toy sub-commands on synthetic media")
+    parser.add_argument("--only", help="Run only cases whose name starts with this prefix")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix="ffmpeg_toy_bench_") as out_dir:
+        for name, seconds, build_argv in build_cases(out_dir):
+            if args.only and not name.startswith(args.only):
+                continue
+            res = run_case(build_argv(), seconds)
+            results[name] = res
+            status = "ok" if res["ok"] else "FAILED"
+            print(f"{name:32s} {res['wall_s']:8.2f}s {res['throughput_x'] or 0:7.2f}x "
+                  f"{res['peak_rss_kib'] / 1024:8.1f} MiB  {status}")
+
+    failed = [name for name, res in results.items() if not res["ok"]]
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(BASELINE_FILE):
+            with open(BASELINE_FILE, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        # A failed run says nothing about the expected cost of a case, so it never becomes the baseline.
+        baseline.update({name: res for name, res in results.items() if res["ok"]})
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {BASELINE_FILE}")
+        for name in failed:
+            print(f"FAILED {name} (not stored)")
+        if failed:
+            sys.exit(1)
+        return
+
+    if not os.path.exists(BASELINE_FILE):
+        print("No baseline yet; run with --update-baseline to record one.")
+        return
+    with open(BASELINE_FILE, "r", encoding="utf-8") as f:
+        regressions = compare(results, json.load(f))
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    for name in failed:
+        print(f"FAILED {name}")
+    if regressions or failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,161 @@
+import csv
 import os
 import sys
-from typing import List
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 
+from constants import DEFAULT_BUS_SIZE, DEFAULT_MAX_DECODERS
+from utils import pcm
+from utils.cache import content_hash
+from utils.executor import run_parallel
 from utils.ffmpeg_utils import run_command
-from utils.metadata import has_audio_stream
+from utils.loudness import measure_loudness, loudnorm_filter
+from utils.metadata import has_audio_stream, get_video_metadata, probe
 
 
-def mix_audio(args) -> None:
-    """Mix external audio tracks into the video."""
-    primary_has_audio: bool = has_audio_stream(args.input)
-    inputs: List[str] = ["-i", args.input]
+@dataclass
+class Cue:
+    start: float
+    file: str
+    gain_db: float = 0.0
+    fade: float = 0.0
+
+
+def load_cue_sheet(path: str) -> List[Cue]:
+    """
+    Read a cue sheet: CSV rows of start,file[,gain_db[,fade]] ('#' starts a comment line).
+    fade is applied as a fade-in and fade-out of that many seconds. Files are relative to the sheet.
+    """
+    base_dir: str = os.path.dirname(os.path.abspath(path))
+    cues: List[Cue] = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row_no, row in enumerate(csv.reader(f), start=1):
+            if not row or row[0].strip().startswith("#") or row[0].strip().lower() == "start":
+                continue
+            try:
+                cue = Cue(start=float(row[0]), file=os.path.join(base_dir, row[1].strip()),
+                          gain_db=float(row[2]) if len(row) > 2 and row[2].strip() else 0.0,
+                          fade=float(row[3]) if len(row) > 3 and row[3].strip() else 0.0)
+            except (IndexError, ValueError) as e:
+                print(f"Error parsing cue sheet {path} line {row_no}: {e}")
+                sys.exit(1)
+            if not os.path.exists(cue.file):
+                print(f"Audio file {cue.file} not found!")
+                sys.exit(1)
+            cues.append(cue)
+    cues.sort(key=lambda c: c.start)
+    return cues
+
+
+def _bus_cmd(cues: List[Cue], offset: float, bus_file: str) -> List[str]:
+    """
+    Render a group of cues to one float WAV stem starting at offset.
+    Each distinct file is opened once and split across the cues that use it;
+    amix runs with normalize=0 so cue gains are not rescaled by the input count.
+    """
+    files: List[str] = list(dict.fromkeys(cue.file for cue in cues))
+    uses: Dict[str, int] = {f: sum(1 for cue in cues if cue.file == f) for f in files}
+    inputs: List[str] = []
+    parts: List[str] = []
+    sources: Dict[str, List[str]] = {}
+    for idx, f in enumerate(files):
+        inputs += ["-i", f]
+        if uses[f] > 1:
+            labels = [f"[f{idx}_{n}]" for n in range(uses[f])]
+            parts.append(f"[{idx}:a]asplit={uses[f]}{''.join(labels)}")
+            sources[f] = labels
+        else:
+            sources[f] = [f"[{idx}:a]"]
+    labels: List[str] = []
+    for n, cue in enumerate(cues):
+        chain: List[str] = [f"volume={cue.gain_db}dB"]
+        if cue.fade > 0:
+            length: float = probe(cue.file).duration or 0.0
+            chain.append(f"afade=t=in:d={cue.fade}")
+            if length > cue.fade:
+                chain.append(f"afade=t=out:st={length - cue.fade}:d={cue.fade}")
+        delay_ms: int = int(round((cue.start - offset) * 1000))
+        chain.append(f"adelay={delay_ms}:all=1")
+        parts.append(f"{sources[cue.file].pop()}{','.join(chain)}[c{n}]")
+        labels.append(f"[c{n}]")
+    parts.append(f"{''.join(labels)}amix=inputs={len(labels)}:duration=longest:normalize=0[outa]")
+    return ["ffmpeg", "-y"] + inputs + ["-filter_complex", "; ".join(parts), "-map", "[outa]",
+                                        "-c:a", "pcm_f32le", bus_file]
+
+
+def _render_buses(cues: List[Cue], tmp_dir: str, bus_size: int) -> List[Cue]:
+    """
+    Pre-render cues in start-ordered groups of at most bus_size, in parallel.
+    Only bus_size decoders are open per process, and at most DEFAULT_MAX_DECODERS across the buses
+    rendering at once, so file descriptors and memory stay bounded; groups of stems are mixed again
+    until few enough remain for the final mix.
+    """
+    concurrent: int = max(1, min(os.cpu_count() or 1, DEFAULT_MAX_DECODERS // bus_size))
+    level: int = 0
+    while len(cues) > bus_size:
+        groups: List[List[Cue]] = [cues[i:i + bus_size] for i in range(0, len(cues), bus_size)]
+        cmds: List[List[str]] = []
+        stems: List[Cue] = []
+        for n, group in enumerate(groups):
+            offset: float = group[0].start
+            bus_file: str = os.path.join(tmp_dir, f"bus_{level}_{n}.wav")
+            cmds.append(_bus_cmd(group, offset, bus_file))
+            stems.append(Cue(start=offset, file=bus_file))
+        run_parallel(cmds, core_budget=concurrent, stages=[f"mix:bus{level}_{n}" for n in range(len(cmds))])
+        cues = stems
+        level += 1
+    return cues
+
+
+def _with_loudnorm(args, inputs: List[str], graph: str, sources: Optional[List[Any]] = None) -> Tuple[str, str]:
+    """Append the cached two-pass loudnorm stage to an audio graph ending in [outa] when --normalize is set."""
+    if not args.normalize:
+        return graph, "[outa]"
+    measurement = measure_loudness(inputs, graph, sources=sources)
+    return f"{graph}; [outa]{loudnorm_filter(measurement)}[norma]", "[norma]"
+
+
+def mix_cue_sheet(args, cues: List[Cue], primary_has_audio: bool) -> None:
+    """Mix any number of cues into the video through bounded-size sub-buses."""
+    if not cues:
+        print("No cues to mix.")
+        sys.exit(1)
+    with tempfile.TemporaryDirectory(prefix="ffmpeg_toy_mix_") as tmp_dir:
+        stems: List[Cue] = _render_buses(cues, tmp_dir, DEFAULT_BUS_SIZE)
+        bus_file: str = os.path.join(tmp_dir, "bus_final.wav")
+        run_command(_bus_cmd(stems, 0.0, bus_file), stage="mix:bus_final")
+        inputs: List[str] = ["-i", args.input, "-i", bus_file]
+        if primary_has_audio:
+            graph: str = "[0:a][1:a]amix=inputs=2:duration=first:normalize=0[outa]"
+        else:
+            graph = "[1:a]anull[outa]"
+        # The bus file is rendered per job; key the measurement on what it was mixed from.
+        sources: List[Any] = [content_hash(args.input)] + [
+            (cue.start, content_hash(cue.file), cue.gain_db, cue.fade) for cue in cues
+        ]
+        graph, out_label = _with_loudnorm(args, inputs, graph, sources)
+        cmd: List[str] = ["ffmpeg", "-y"] + inputs + ["-filter_complex", graph, "-map", "0:v", "-map", out_label]
+        if not primary_has_audio:
+            cmd.append("-shortest")
+        cmd += ["-c:v", "copy", "-c:a", "aac", args.output]
+        run_command(cmd, stage="mix:final")
+
+
+def build_mix_filter(mix_items: Optional[List[List[str]]], primary_label: Optional[str],
+                     first_input_index: int) -> Tuple[List[str], List[str]]:
+    """
+    Build the extra -i inputs and the adelay/amix filter parts for --mix items.
+    Mix files are numbered from first_input_index; the mixed result is labelled [outa].
+    """
+    inputs: List[str] = []
     filter_complex_parts: List[str] = []
     audio_labels: List[str] = []
-    if primary_has_audio:
-        audio_labels.append("[0:a]")
-    input_index: int = 1
-    if args.mix is not None:
-        for item in args.mix:
+    if primary_label is not None:
+        audio_labels.append(primary_label)
+    input_index: int = first_input_index
+    if mix_items is not None:
+        for item in mix_items:
             try:
                 start_time: float = float(item[0])
                 audio_file: str = item[1]
@@ -38,13 +177,64 @@ def mix_audio(args) -> None:
     audio_inputs: str = "".join(audio_labels)
     num_inputs: int = len(audio_labels)
     filter_complex_parts.append(f"{audio_inputs}amix=inputs={num_inputs}:duration=shortest[outa]")
-    filter_complex: str = "; ".join(filter_complex_parts)
+    return inputs, filter_complex_parts
+
+
+def _mix_cues_numpy(args, cues: List[Cue], primary_has_audio: bool) -> None:
+    """
+    Mix cues as array operations on decoded PCM: each cue is delayed and summed at its own gain
+    (no amix rescaling), and the result runs for the length of the input video.
+    Each distinct cue file is decoded once and memory-mapped from the PCM cache, so only the
+    pages of cues being summed are resident.
+    """
+    duration: float = get_video_metadata(args.input)[0] or 0.0
+    base = pcm.decode_pcm(args.input) if primary_has_audio else pcm.silence(duration)
+    assets: Dict[str, object] = {}
+    mixed = []
+    for cue in cues:
+        if cue.file not in assets:
+            assets[cue.file] = pcm.decode_pcm(cue.file)
+        mixed.append((cue.start, assets[cue.file], 10 ** (cue.gain_db / 20), cue.fade))
+    pcm.encode_pcm(pcm.mix(base, mixed), args.output, video_input=args.input)
+
+
+def _mix_audio_numpy(args, primary_has_audio: bool) -> None:
+    for item in args.mix or []:
+        if not os.path.exists(item[1]):
+            print(f"Audio file {item[1]} not found!")
+            sys.exit(1)
+    cues: List[Cue] = [Cue(start=float(item[0]), file=item[1]) for item in args.mix or []]
+    _mix_cues_numpy(args, cues, primary_has_audio)
+
+
+def mix_audio(args) -> None:
+    """Mix external audio tracks into the video."""
+    primary_has_audio: bool = has_audio_stream(args.input)
+    if args.cue_sheet is not None:
+        cues: List[Cue] = load_cue_sheet(args.cue_sheet)
+        cues += [Cue(start=float(item[0]), file=item[1]) for item in args.mix or []]
+        cues.sort(key=lambda c: c.start)
+        if args.engine == "numpy":
+            if args.normalize:
+                print("Warning: --normalize is not supported by the numpy engine; skipping.")
+            _mix_cues_numpy(args, cues, primary_has_audio)
+        else:
+            mix_cue_sheet(args, cues, primary_has_audio)
+        return
+    if args.engine == "numpy":
+        if args.normalize:
+            print("Warning: --normalize is not supported by the numpy engine; skipping.")
+        _mix_audio_numpy(args, primary_has_audio)
+        return
+    mix_inputs, filter_complex_parts = build_mix_filter(args.mix, "[0:a]" if primary_has_audio else None, 1)
+    inputs: List[str] = ["-i", args.input] + mix_inputs
+    filter_complex, out_label = _with_loudnorm(args, inputs, "; ".join(filter_complex_parts))
     print("Constructed audio filter_complex:")
     print(filter_complex)
     cmd: List[str] = ["ffmpeg", "-y"] + inputs + [
         "-filter_complex", filter_complex,
         "-map", "0:v",
-        "-map", "[outa]",
+        "-map", out_label,
         "-c:v", "copy",
         "-c:a", "aac",
         args.output
@@ -1,9 +1,51 @@
-import os
-from typing import List
-
-import math
+import sys
+from typing import List, Optional
 
+from utils import pcm
 from utils.ffmpeg_utils import run_command, copy_file
+from utils.metadata import probe, MediaInfo
+
+
+def build_audio_loop_filter(cut_duration: Optional[float], loop_start: Optional[float], loop_end: Optional[float],
+                            loop_total: Optional[float], sample_rate: int) -> str:
+    """
+    Build one filtergraph that keeps the first cut_duration seconds, then repeats
+    [loop_start, loop_end) until loop_total seconds have played.
+    Working on decoded samples makes the loop joins sample-accurate (no MP3 frame-boundary clicks).
+    """
+    if loop_start is None or loop_end is None or loop_total is None:
+        return f"[0:a]atrim=end={cut_duration}[outa]"
+    loop_samples: int = int(round((loop_end - loop_start) * sample_rate))
+    loop_chain: str = (
+        f"[0:a]atrim=start={loop_start}:end={loop_end},asetpts=PTS-STARTPTS,"
+        f"aloop=loop=-1:size={loop_samples},asetpts=N/SR/TB,atrim=end={loop_total}"
+    )
+    if not cut_duration:
+        return f"{loop_chain}[outa]"
+    return (
+        f"[0:a]atrim=end={cut_duration},asetpts=PTS-STARTPTS[head]; "
+        f"{loop_chain}[loop]; "
+        f"[head][loop]concat=n=2:v=0:a=1[outa]"
+    )
+
+
+def _process_audio_numpy(args) -> None:
+    """Cut and loop on a cached, memory-mapped PCM buffer, then stream the result to one encoder."""
+    crossfade: float = args.crossfade if args.crossfade is not None else 0.0
+    buf = pcm.decode_pcm(args.input)
+    parts = []
+    if args.cut_duration:
+        parts.append(pcm.cut(buf, 0.0, args.cut_duration))
+    if args.loop_start is not None and args.loop_end is not None and args.loop_total is not None:
+        parts.append(pcm.loop(pcm.cut(buf, args.loop_start, args.loop_end), args.loop_total, crossfade))
+    if not parts:
+        print("Nothing to process.")
+        sys.exit(1)
+    out = parts[0]
+    if len(parts) > 1:
+        out = pcm.equal_power_crossfade(parts[0], parts[1], int(crossfade * pcm.PCM_SAMPLE_RATE))
+    pcm.encode_pcm(out, args.output)
+    print(f"Processed audio saved to {args.output}")
 
 
 def process_audio(args) -> None:
@@ -16,48 +58,29 @@ def process_audio(args) -> None:
         copy_file(args.input, args.output)
         return
 
-    cut_duration: float = args.cut_duration
-    loop_start: float = args.loop_start
-    loop_end: float = args.loop_end
-    loop_total: float = args.loop_total
+    if args.engine == "numpy":
+        _process_audio_numpy(args)
+        return
 
-    part_file: str = "temp_part.mp3"
-    cmd1: List[str] = [
-        "ffmpeg", "-y", "-i", args.input,
-        "-t", str(cut_duration),
-        "-c", "copy", part_file
-    ]
-    run_command(cmd1)
+    info: MediaInfo = probe(args.input)
+    if not info.audio:
+        print(f"Error: {args.input} has no audio stream.")
+        sys.exit(1)
+    sample_rate: int = info.audio[0].sample_rate or 44100
+    filter_complex: str = build_audio_loop_filter(args.cut_duration, args.loop_start, args.loop_end,
+                                                  args.loop_total, sample_rate)
+    print("Constructed filter_complex:")
+    print(filter_complex)
 
-    loop_duration: float = loop_end - loop_start
-    loop_file: str = "temp_loop.mp3"
-    cmd2: List[str] = [
+    # Cut, loop and concat happen in one process with a single encode and no scratch files.
+    cmd: List[str] = [
         "ffmpeg", "-y", "-i", args.input,
-        "-ss", str(loop_start),
-        "-t", str(loop_duration),
-        "-c", "copy", loop_file
-    ]
-    run_command(cmd2)
-
-    total_loops: int = math.ceil(loop_total / loop_duration) - 1
-    loop_full_file: str = "temp_loop_full.mp3"
-    cmd3: List[str] = [
-        "ffmpeg", "-y", "-stream_loop", str(total_loops),
-        "-i", loop_file,
-        "-t", str(loop_total),
-        "-c", "copy", loop_full_file
-    ]
-    run_command(cmd3)
-
-    concat_list_file: str = "concat_list.txt"
-    with open(concat_list_file, "w", encoding="utf-8") as f:
-        f.write(f"file '{os.path.abspath(part_file)}'\n")
-        f.write(f"file '{os.path.abspath(loop_full_file)}'\n")
-
-    cmd4: List[str] = [
-        "ffmpeg", "-y", "-f", "concat", "-safe", "0",
-        "-i", concat_list_file,
-        "-c", "copy", args.output
+        "-filter_complex", filter_complex,
+        "-map", "[outa]"
     ]
-    run_command(cmd4)
+    bit_rate: Optional[int] = info.audio[0].bit_rate or info.bit_rate
+    if bit_rate:
+        cmd += ["-b:a", str(bit_rate)]
+    cmd.append(args.output)
+    run_command(cmd, stage="audioprocess")
     print(f"Processed audio saved to {args.output}")
@@ -0,0 +1,234 @@
+import argparse
+
+from cmd.audio_mixing import mix_audio
+from cmd.audio_process import process_audio
+from cmd.compression import compress_video
+from cmd.daemon import serve, submit
+from cmd.filters.filter import apply_filters
+from cmd.fused import fuse_render
+from cmd.project import run_project
+from cmd.split_splice import split_video, adjust_segment
+from cmd.sync import sync_video
+from cmd.thumbs import make_thumbs
+from constants import (
+    DEFAULT_DAEMON_PORT, DEFAULT_DAEMON_WORKERS, DEFAULT_THUMB_COUNT, DEFAULT_THUMB_WIDTH, DEFAULT_THUMB_COLUMNS,
+    DEFAULT_CHUNK_CORES
+)
+from utils.onsets import analyze_command
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Generic Video Editing Tool using FFmpeg")
+    # Global argument: by default audio is kept. Use --no-audio to remove audio.
+    parser.add_argument("--no-audio", action="store_true",
+                        help="Remove audio track from the output (default: keep audio)")
+    parser.add_argument("--metrics", help="Append a JSON metrics record per ffmpeg stage to this file")
+
+    subparsers = parser.add_subparsers(dest="command", required=True, help="Sub-commands")
+
+    # audioprocess sub-command
+    audioprocess_parser = subparsers.add_parser("audioprocess", help="Process an audio file: cut and loop segments")
+    audioprocess_parser.add_argument("input", help="Input audio file")
+    audioprocess_parser.add_argument("output", help="Output processed audio file")
+    audioprocess_parser.add_argument("--cut-duration", type=float, help="Duration (in seconds) to cut from start")
+    audioprocess_parser.add_argument("--loop-start", type=float, help="Loop segment start time (in seconds)")
+    audioprocess_parser.add_argument("--loop-end", type=float, help="Loop segment end time (in seconds)")
+    audioprocess_parser.add_argument("--loop-total", type=float, help="Total duration (in seconds) for looped segment")
+    audioprocess_parser.add_argument("--engine", choices=["ffmpeg", "numpy"], default="ffmpeg",
+                                     help="ffmpeg: one filtergraph (default). numpy: in-process PCM edits")
+    audioprocess_parser.add_argument("--crossfade", type=float,
+                                     help="Equal-power crossfade (in seconds) at loop joins; numpy engine only")
+    audioprocess_parser.set_defaults(func=process_audio)
+
+    # compress sub-command
+    compress_parser = subparsers.add_parser("compress", help="Compress video to a target size")
+    compress_parser.add_argument("input", help="Input video file")
+    compress_parser.add_argument("output", help="Output video file")
+    compress_parser.add_argument("--size", type=int, help="Target file size in MB")
+    compress_parser.add_argument("--resolution", help="Scale resolution (e.g. '640:-2')")
+    compress_parser.add_argument("--denoise", help="Denoise strength (off, low, med, high)")
+    compress_parser.add_argument("--preset", help="x265 preset")
+    compress_parser.add_argument("--mute", action="store_true", help="Strip audio track")
+    compress_parser.add_argument("--preview", type=int, help="Encode only first N seconds for testing")
+    compress_parser.add_argument("--speed", type=float, help="Playback speed factor")
+    compress_parser.add_argument("--normalize", action="store_true",
+                                 help="Two-pass loudnorm of the audio; the measurement is cached per input")
+    compress_parser.add_argument("--reanalyze", action="store_true",
+                                 help="Ignore cached x265 pass-1 stats for this input and filter chain")
+    compress_parser.add_argument("--fast", action="store_true",
+                                 help="Predict a CRF from short samples and encode once instead of two full passes")
+    compress_parser.add_argument("--chunked", action="store_true",
+                                 help="Split at keyframes and encode chunks in parallel, then concat losslessly")
+    compress_parser.add_argument("--jobs", type=int,
+                                 help=f"Parallel chunk encodes for --chunked "
+                                      f"(default: one per {DEFAULT_CHUNK_CORES} cores)")
+    compress_parser.add_argument("--no-preflight", action="store_true",
+                                 help="Skip validating the graph on a short sample before encoding")
+    compress_parser.set_defaults(func=compress_video)
+
+    # mix sub-command
+    mix_parser = subparsers.add_parser("mix", help="Mix external audio tracks into the video")
+    mix_parser.add_argument("input", help="Input video file")
+    mix_parser.add_argument("output", help="Output video file")
+    mix_parser.add_argument("--mix", nargs=2, action="append", metavar=("START", "FILE"),
+                            help="Mix item: start time and audio file (can be repeated)")
+    mix_parser.add_argument("--cue-sheet",
+                            help="CSV cue sheet of start,file[,gain_db[,fade]] rows, mixed via bounded sub-buses")
+    mix_parser.add_argument("--normalize", action="store_true",
+                            help="Two-pass loudnorm of the mix; the measurement is cached per input content")
+    mix_parser.add_argument("--engine", choices=["ffmpeg", "numpy"], default="ffmpeg",
+                            help="ffmpeg: adelay/amix graph (default). numpy: in-process unity-gain PCM mix")
+    mix_parser.set_defaults(func=mix_audio)
+
+    # effects sub-command
+    effects_parser = subparsers.add_parser("effects", help="Apply video effects over specified time segments")
+    effects_parser.add_argument("input", help="Input video file")
+    effects_parser.add_argument("output", help="Output video file")
+    effects_parser.add_argument("--effect", nargs="+", action="append",
+                                metavar="EFFECT_ITEM",
+                                help=("Effect item parameters. For a normal effect: start end filter_chain [speed]. "
+                                      "For a blend effect: start end blend phase [crossfade_start crossfade_end]."))
+    effects_parser.add_argument("--render", choices=["full", "smart"], default="full",
+                                help=("full: re-encode the whole file (default). smart: stream-copy untouched "
+                                      "ranges on keyframes and encode only the effect ranges in parallel"))
+    effects_parser.add_argument("--backend", choices=["concat", "linear"], default="concat",
+                                help=("Filter graph compiler. concat: trim each segment into its own branch "
+                                      "(default). linear: one chain gated with enable=, no per-segment trim branches"))
+    effects_parser.add_argument("--jobs", type=int, help="Parallel encode jobs for --render smart (default: CPU count)")
+    effects_parser.add_argument("--cache-size", type=int,
+                                help="Segment render cache budget in MB for --render smart (0 disables, default 2048)")
+    effects_parser.add_argument("--variant", nargs="+", action="append", metavar="VARIANT_ITEM",
+                                help=("Variant: name followed by blend overrides (can be repeated). All variants "
+                                      "are rendered from one decode to OUTPUT_<name>"))
+    effects_parser.add_argument("--proxy", action="store_true",
+                                help="Fast preview against a cached low-res proxy; rerun without it for the final")
+    effects_parser.add_argument("--no-preflight", action="store_true",
+                                help="Skip validating the graph on a short sample before encoding")
+    effects_parser.set_defaults(func=apply_filters)
+
+    # split sub-command
+    split_parser = subparsers.add_parser("split", help="Extract video segments into separate files")
+    split_parser.add_argument("input", help="Input video file")
+    split_parser.add_argument("output", help="Output directory for segments")
+    split_parser.add_argument("--segment", nargs=2, action="append", metavar=("START", "END"),
+                              help="Segment to extract: start and end times in seconds (can be repeated)")
+    split_parser.add_argument("--single-pass", action="store_true",
+                              help="Stream-copy every segment from a single demux pass in one ffmpeg process")
+    split_parser.add_argument("--smart-cut", action="store_true",
+                              help="Frame-accurate cuts: re-encode only the partial GOPs at each edge")
+    split_parser.add_argument("--reencode", action="store_true",
+                              help="Re-encode each segment for frame-accurate cuts instead of stream-copying")
+    split_parser.add_argument("--jobs", type=int, help="Number of parallel workers for --reencode (default: 1)")
+    split_parser.set_defaults(func=split_video)
+
+    # adjust sub-command
+    adjust_parser = subparsers.add_parser("adjust", help="Adjust a segment using the original video as source")
+    adjust_parser.add_argument("orig", help="Original video file")
+    adjust_parser.add_argument("output", help="Output adjusted segment file")
+    adjust_parser.add_argument("--orig-start", required=True, help="Original start time of the segment in seconds")
+    adjust_parser.add_argument("--orig-end", required=True, help="Original end time of the segment in seconds")
+    adjust_parser.add_argument("--start-offset", type=float,
+                               help="Offset to add to the original start time (negative to add before)")
+    adjust_parser.add_argument("--end-offset", type=float,
+                               help="Offset to add to the original end time (positive to add after)")
+    adjust_parser.add_argument("--smart-cut", action="store_true",
+                               help="Frame-accurate cut: re-encode only the partial GOPs at each edge")
+    adjust_parser.set_defaults(func=adjust_segment)
+
+    # sync sub-command
+    sync_parser = subparsers.add_parser("sync",
+                                        help="Synchronize glitched video with a musical cue and splice in a segment")
+    sync_parser.add_argument("input", help="Input video file")
+    sync_parser.add_argument("output", help="Output video file")
+    sync_parser.add_argument("--audio-cue", required=True,
+                             help="Audio time when the splice starts: seconds, or with --audio e.g. 'beat 32'")
+    sync_parser.add_argument("--audio",
+                             help="Audio track used to resolve cues like 'beat 32' or 'next onset after 15s'")
+    sync_parser.add_argument("--cue-end", required=True,
+                             help="Audio time when the splice ends: seconds, or with --audio e.g. 'next onset after 15s'")
+    sync_parser.add_argument("--segment-start", required=True,
+                             help="Original start time of the splice segment (in seconds)")
+    sync_parser.add_argument("--segment-end", required=True,
+                             help="Original end time of the splice segment (in seconds)")
+    sync_parser.add_argument("--ramp",
+                             help="Ramp the speed up to the splice rate: linear, exp, or knots '0:0,0.7:0.2,1:1'")
+    sync_parser.add_argument("--ramp-duration", type=float,
+                             help="Source seconds before segment-start to ramp over (default: all of them)")
+    sync_parser.add_argument("--proxy", action="store_true",
+                             help="Fast preview against a cached low-res proxy; rerun without it for the final")
+    sync_parser.add_argument("--no-preflight", action="store_true",
+                             help="Skip validating the graph on a short sample before encoding")
+    sync_parser.set_defaults(func=sync_video)
+
+    # analyze sub-command
+    analyze_parser = subparsers.add_parser("analyze", help="Detect tempo, beats and onsets in an audio file")
+    analyze_parser.add_argument("input", help="Input audio file")
+    analyze_parser.add_argument("--show", type=int, help="Number of beats/onsets to list (default: 16)")
+    analyze_parser.set_defaults(func=analyze_command)
+
+    # fuse sub-command
+    fuse_parser = subparsers.add_parser("fuse",
+                                        help="Render sync, mix and effects as one ffmpeg graph with a single encode")
+    fuse_parser.add_argument("input", help="Input video file")
+    fuse_parser.add_argument("output", help="Output video file")
+    fuse_parser.add_argument("--audio-cue", required=True,
+                             help="Audio time when the splice starts: seconds, or with --audio e.g. 'beat 32'")
+    fuse_parser.add_argument("--audio",
+                             help="Audio track used to resolve cues like 'beat 32' or 'next onset after 15s'")
+    fuse_parser.add_argument("--cue-end", required=True,
+                             help="Audio time when the splice ends: seconds, or with --audio e.g. 'next onset after 15s'")
+    fuse_parser.add_argument("--segment-start", required=True,
+                             help="Original start time of the splice segment (in seconds)")
+    fuse_parser.add_argument("--segment-end", required=True,
+                             help="Original end time of the splice segment (in seconds)")
+    fuse_parser.add_argument("--ramp",
+                             help="Ramp the speed up to the splice rate: linear, exp, or knots '0:0,0.7:0.2,1:1'")
+    fuse_parser.add_argument("--ramp-duration", type=float,
+                             help="Source seconds before segment-start to ramp over (default: all of them)")
+    fuse_parser.add_argument("--mix", nargs=2, action="append", metavar=("START", "FILE"),
+                             help="Mix item: start time and audio file (can be repeated)")
+    fuse_parser.add_argument("--effect", nargs="+", action="append", metavar="EFFECT_ITEM",
+                             help="Effect item on the synced timeline, as for the effects sub-command")
+    fuse_parser.set_defaults(func=fuse_render)
+
+    # thumbs sub-command
+    thumbs_parser = subparsers.add_parser("thumbs",
+                                          help="Contact sheet of frames at effect boundaries and segment edges")
+    thumbs_parser.add_argument("input", help="Input video file")
+    thumbs_parser.add_argument("output", help="Output image file")
+    thumbs_parser.add_argument("--effect", nargs="+", action="append", metavar="EFFECT_ITEM",
+                               help="Effect item as for the effects sub-command; its boundaries are sampled exactly")
+    thumbs_parser.add_argument("--segment", nargs=2, action="append", metavar=("START", "END"),
+                               help="Segment whose edges are sampled exactly (can be repeated)")
+    thumbs_parser.add_argument("--interval", type=float,
+                               help="Also sample the keyframe at or before every N seconds "
+                                    f"(default without effects/segments: {DEFAULT_THUMB_COUNT} evenly spaced)")
+    thumbs_parser.add_argument("--width", type=int, help=f"Thumbnail width (default: {DEFAULT_THUMB_WIDTH})")
+    thumbs_parser.add_argument("--columns", type=int, help=f"Tiles per row (default: {DEFAULT_THUMB_COLUMNS})")
+    thumbs_parser.add_argument("--jobs", type=int, help="Parallel extractions (default: CPU count)")
+    thumbs_parser.set_defaults(func=make_thumbs)
+
+    # run sub-command
+    run_parser = subparsers.add_parser("run", help="Run a JSON project file as an incremental build DAG")
+    run_parser.add_argument("project", help="Project JSON file")
+    run_parser.add_argument("--jobs", type=int, help="Maximum steps to run concurrently (default: CPU count)")
+    run_parser.add_argument("--force", action="store_true", help="Re-run every step even if it is up to date")
+    run_parser.set_defaults(func=run_project)
+
+    # serve sub-command
+    serve_parser = subparsers.add_parser("serve", help="Run a local render daemon with a de-duplicating job queue")
+    serve_parser.add_argument("--port", type=int, help=f"Localhost port (default: {DEFAULT_DAEMON_PORT})")
+    serve_parser.add_argument("--workers", type=int,
+                              help=f"Jobs rendered concurrently (default: {DEFAULT_DAEMON_WORKERS})")
+    serve_parser.set_defaults(func=serve)
+
+    # submit sub-command
+    submit_parser = subparsers.add_parser("submit", help="Queue a sub-command on a running render daemon")
+    submit_parser.add_argument("job", nargs=argparse.REMAINDER,
+                               help="Sub-command and its arguments, e.g. -- compress in.mp4 out.mp4 --size 10")
+    submit_parser.add_argument("--port", type=int, help=f"Daemon port (default: {DEFAULT_DAEMON_PORT})")
+    submit_parser.add_argument("--priority", type=int, help="Lower runs first (default: 0)")
+    submit_parser.add_argument("--wait", action="store_true", help="Block until the job finishes")
+    submit_parser.set_defaults(func=submit)
+
+    return parser
@@ -1,13 +1,263 @@
+import math
 import os
+import shutil
 import sys
+import tempfile
+from typing import List, Optional, Tuple
 
 from constants import (
     DEFAULT_TARGET_SIZE_MB, DEFAULT_RESOLUTION, DEFAULT_DENOISE, DEFAULT_PRESET,
     DEFAULT_PREVIEW_DURATION, DEFAULT_SPEED_FACTOR, DEFAULT_AUDIO_BITRATE,
-    DEFAULT_MIN_VIDEO_KBPS, DEFAULT_OVERHEAD, DEFAULT_FALLBACK_FPS
+    DEFAULT_MIN_VIDEO_KBPS, DEFAULT_OVERHEAD, DEFAULT_FALLBACK_FPS, DEFAULT_CHUNK_SECONDS, DEFAULT_CHUNK_CORES,
+    DEFAULT_SAMPLE_COUNT, DEFAULT_SAMPLE_SECONDS, DEFAULT_SAMPLE_CRFS, DEFAULT_SIZE_TOLERANCE,
+    DEFAULT_X265_STATS_CACHE_MB
 )
+from utils.cache import cache_dir, cached_file, evict_lru, file_identity, hash_key
+from utils.executor import run_parallel
 from utils.ffmpeg_utils import run_command
-from utils.metadata import get_video_metadata, calculate_bitrate_kbps, build_filter_string
+from utils.preflight import preflight
+from utils.loudness import normalize_audio_filter
+from utils.metadata import (
+    get_video_metadata, get_packet_index, calculate_bitrate_kbps, build_filter_string, has_audio_stream
+)
+
+
+X265_TUNING = ("me=star:subme=7:rc-lookahead=60:psy-rd=2.0:psy-rdoq=1.0:aq-mode=3:aq-strength=1.0:"
+               "rdoq-level=2:bframes=5:ref=5")
+
+
+def x265_pass_cmd(input_file: str, pass_no: int, stats_file: str, video_kbps: int, preset: str,
+                  fps_str: str, input_args: Optional[List[str]] = None) -> List[str]:
+    """Common head of an x265 two-pass command; callers append audio, filter, duration and output options."""
+    return ["ffmpeg", "-y"] + (input_args or []) + [
+        "-i", input_file,
+        "-c:v", "libx265",
+        "-b:v", f"{video_kbps}k",
+        "-preset", preset,
+        "-x265-params", f"pass={pass_no}:stats={stats_file}:{X265_TUNING}",
+        "-fps_mode", "cfr",
+        "-r", fps_str
+    ]
+
+
+def cached_x265_stats(key: str) -> Optional[str]:
+    """Return the cached pass-1 stats file for key if both it and its cutree companion exist."""
+    stats_file: Optional[str] = cached_file("x265stats", key, ".log")
+    # Mark the .cutree as used too, so LRU eviction keeps or drops the pair together.
+    if stats_file is None or cached_file("x265stats", key, ".log.cutree") is None:
+        return None
+    return stats_file
+
+
+def store_x265_stats(key: str, job_log: str) -> str:
+    """
+    Publish a finished pass-1 stats file (and its .cutree data) in the cache and return its path.
+    Both are copied to unique names inside the cache dir and renamed into place, the .log last:
+    renames are atomic, and cached_x265_stats only accepts a .log whose .cutree already exists.
+    The cache is then trimmed to DEFAULT_X265_STATS_CACHE_MB, least recently used first; a pair
+    that loses either file is simply re-analysed.
+    """
+    directory: str = cache_dir("x265stats")
+    stats_file: str = os.path.join(directory, f"{key}.log")
+    for src, dst in ((f"{job_log}.cutree", f"{stats_file}.cutree"), (job_log, stats_file)):
+        if not os.path.exists(src):
+            continue
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copyfile(src, tmp_path)
+            os.replace(tmp_path, dst)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    evict_lru("x265stats", DEFAULT_X265_STATS_CACHE_MB * 1024 * 1024)
+    return stats_file
+
+
+def plan_chunks(keyframes: List[float], duration: float, chunk_seconds: float) -> List[Tuple[float, float]]:
+    """Split [0, duration) into chunks of roughly chunk_seconds, each starting on a keyframe."""
+    bounds: List[float] = [0.0]
+    for kf in keyframes:
+        if kf - bounds[-1] >= chunk_seconds and duration - kf >= chunk_seconds / 2:
+            bounds.append(kf)
+    bounds.append(duration)
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+
+def allocate_chunk_bitrates(chunks: List[Tuple[float, float]], bytes_per_second: List[int],
+                            video_kbps: int, min_kbps: int) -> List[int]:
+    """
+    Spread the total video bit budget across chunks by complexity.
+    Each chunk's share blends its share of source bytes (complexity) with its share of duration,
+    so static chunks are not starved and busy chunks get more bits, while the total stays on target.
+    """
+    total_duration: float = sum(end - start for start, end in chunks)
+    chunk_bytes: List[int] = [sum(bytes_per_second[int(start):max(int(start) + 1, int(end))]) for start, end in chunks]
+    total_bytes: int = sum(chunk_bytes)
+    total_bits: float = video_kbps * total_duration
+    rates: List[int] = []
+    for (start, end), size in zip(chunks, chunk_bytes):
+        length: float = end - start
+        duration_share: float = length / total_duration
+        complexity_share: float = size / total_bytes if total_bytes > 0 else duration_share
+        share: float = 0.5 * complexity_share + 0.5 * duration_share
+        rates.append(max(min_kbps, int(total_bits * share / length)))
+    return rates
+
+
+def _chunk_commands(input_file: str, tmp_dir: str, n: int, start: float, end: float, video_kbps: int,
+                    preset: str, fps_str: str, vf_str: Optional[str]) -> Tuple[List[str], List[str], str]:
+    """Pass-1 and pass-2 commands of one chunk, with a stats file of its own, and the chunk path."""
+    stats_file: str = os.path.join(tmp_dir, f"chunk_{n}.log")
+    chunk_file: str = os.path.join(tmp_dir, f"chunk_{n}.mkv")
+    # Bound the chunk on the input side so a speed filter cannot change how much source it covers.
+    seek: List[str] = ["-ss", str(start), "-t", str(end - start)]
+    tail: List[str] = ["-vf", vf_str] if vf_str is not None else []
+    pass1_cmd = x265_pass_cmd(input_file, 1, stats_file, video_kbps, preset, fps_str, seek)
+    pass2_cmd = x265_pass_cmd(input_file, 2, stats_file, video_kbps, preset, fps_str, seek)
+    pass1_cmd += ["-an"] + tail + ["-f", "null", "/dev/null"]
+    pass2_cmd += ["-an"] + tail + [chunk_file]
+    return pass1_cmd, pass2_cmd, chunk_file
+
+
+def compress_chunked(input_file: str, output_file: str, duration: float, video_kbps: int, preset: str,
+                     fps_str: str, vf_str: Optional[str], mute: bool, jobs: int,
+                     af_str: Optional[str] = None) -> None:
+    """
+    Split the input at keyframes and two-pass encode the chunks in parallel, with the bit budget
+    spread across chunks by complexity, then join the chunks losslessly with the concat demuxer.
+    At most jobs chunks encode at once and the machine's cores are split between them, so each
+    x265 instance gets a matching thread pool instead of one worker per core.
+    """
+    index = get_packet_index(input_file)
+    chunks: List[Tuple[float, float]] = plan_chunks(index["keyframes"], duration, DEFAULT_CHUNK_SECONDS)
+    rates: List[int] = allocate_chunk_bitrates(chunks, index["bytes_per_second"], video_kbps,
+                                               DEFAULT_MIN_VIDEO_KBPS)
+    parallel: int = max(1, min(jobs, len(chunks)))
+    cores_per_job: int = max(1, (os.cpu_count() or 1) // parallel)
+    print(f"\n=== CHUNKED: {len(chunks)} chunks, {parallel} at a time on {cores_per_job} cores each ===")
+    for (start, end), kbps in zip(chunks, rates):
+        print(f"  {start:.2f}s-{end:.2f}s: {kbps} kb/s")
+
+    with tempfile.TemporaryDirectory(prefix="ffmpeg_toy_chunks_") as tmp_dir:
+        planned: List[Tuple[List[str], List[str], str]] = [
+            _chunk_commands(input_file, tmp_dir, n, start, end, kbps, preset, fps_str, vf_str)
+            for n, ((start, end), kbps) in enumerate(zip(chunks, rates))
+        ]
+        # Pass 2 of a chunk reads its pass-1 stats, so every pass 1 finishes first.
+        for pass_no in (1, 2):
+            run_parallel([commands[pass_no - 1] for commands in planned], cores_per_job=cores_per_job,
+                         core_budget=cores_per_job * parallel,
+                         stages=[f"compress:chunk{n}:pass{pass_no}" for n in range(len(planned))])
+        chunk_files: List[str] = [chunk_file for _, _, chunk_file in planned]
+
+        concat_list_file: str = os.path.join(tmp_dir, "concat_list.txt")
+        with open(concat_list_file, "w", encoding="utf-8") as f:
+            for chunk_file in chunk_files:
+                f.write(f"file '{chunk_file}'\n")
+
+        cmd: List[str] = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", concat_list_file]
+        if mute:
+            cmd += ["-map", "0:v", "-c:v", "copy"]
+        else:
+            cmd += ["-t", str(duration), "-i", input_file,
+                    "-map", "0:v", "-map", "1:a?", "-c:v", "copy", "-c:a", "aac", "-b:a", "64k"]
+            if af_str is not None:
+                cmd += ["-af", af_str]
+        cmd.append(output_file)
+        run_command(cmd, stage="compress:concat")
+
+
+def fit_crf_for_bitrate(points: List[Tuple[float, float]], target_kbps: float) -> float:
+    """
+    Fit ln(kbps) = a + b * crf by least squares over (crf, kbps) sample points and solve for target_kbps.
+    Bitrate falls roughly exponentially with CRF, so the log-linear model is accurate between sampled points.
+    """
+    xs: List[float] = [crf for crf, _ in points]
+    ys: List[float] = [math.log(max(kbps, 1e-3)) for _, kbps in points]
+    n: int = len(points)
+    mean_x: float = sum(xs) / n
+    mean_y: float = sum(ys) / n
+    var_x: float = sum((x - mean_x) ** 2 for x in xs)
+    b: float = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x if var_x else -0.1
+    if b >= 0:
+        b = -0.1
+    a: float = mean_y - b * mean_x
+    crf: float = (math.log(target_kbps) - a) / b
+    return min(51.0, max(0.0, crf))
+
+
+def _sample_kbps(input_file: str, tmp_dir: str, starts: List[float], sample_seconds: float, crf: int,
+                 preset: str, fps_str: str, vf_str: Optional[str], speed: Optional[float]) -> float:
+    """Encode every sample at one CRF and return the mean video bitrate in output time."""
+    total_bytes: int = 0
+    for n, start in enumerate(starts):
+        sample_file: str = os.path.join(tmp_dir, f"sample_{crf}_{n}.mkv")
+        cmd: List[str] = [
+            "ffmpeg", "-y", "-ss", str(start), "-t", str(sample_seconds), "-i", input_file,
+            "-c:v", "libx265", "-crf", str(crf), "-preset", preset,
+            "-x265-params", X265_TUNING,
+            "-fps_mode", "cfr", "-r", fps_str, "-an"
+        ]
+        if vf_str is not None:
+            cmd += ["-vf", vf_str]
+        cmd.append(sample_file)
+        run_command(cmd, stage=f"compress:sample:crf{crf}")
+        total_bytes += os.path.getsize(sample_file)
+    out_seconds: float = len(starts) * sample_seconds / (speed if speed is not None and speed > 0 else 1.0)
+    return total_bytes * 8 / 1000 / out_seconds
+
+
+def sampling_pays_off(duration: float) -> bool:
+    """
+    Whether sampled CRF prediction is cheaper than the two-pass encode for this duration.
+    Every CRF point re-encodes all samples, so on short clips the samples cover most of the clip
+    and sampling costs more than a full analysis pass.
+    """
+    sample_seconds: float = min(DEFAULT_SAMPLE_SECONDS, duration / DEFAULT_SAMPLE_COUNT)
+    return len(DEFAULT_SAMPLE_CRFS) * DEFAULT_SAMPLE_COUNT * sample_seconds < duration
+
+
+def compress_sampled(input_file: str, output_file: str, duration: float, video_kbps: int, preset: str,
+                     fps_str: str, vf_str: Optional[str], mute: bool, speed: Optional[float],
+                     af_str: Optional[str] = None) -> float:
+    """
+    Replace the full pass-1 analysis with a few short samples spread across the timeline.
+    The samples are encoded at several CRF points, a size model is fitted, and one final CRF encode
+    is made at the CRF predicted to hit video_kbps. Returns the CRF used.
+    """
+    sample_seconds: float = min(DEFAULT_SAMPLE_SECONDS, duration / DEFAULT_SAMPLE_COUNT)
+    step: float = duration / DEFAULT_SAMPLE_COUNT
+    starts: List[float] = [step * i + (step - sample_seconds) / 2 for i in range(DEFAULT_SAMPLE_COUNT)]
+    print(f"\n=== SAMPLING: {len(starts)} x {sample_seconds:.1f}s at CRF {DEFAULT_SAMPLE_CRFS} ===")
+    with tempfile.TemporaryDirectory(prefix="ffmpeg_toy_samples_") as tmp_dir:
+        points: List[Tuple[float, float]] = [
+            (crf, _sample_kbps(input_file, tmp_dir, starts, sample_seconds, crf, preset, fps_str, vf_str, speed))
+            for crf in DEFAULT_SAMPLE_CRFS
+        ]
+    for crf, kbps in points:
+        print(f"  CRF {crf}: {kbps:.0f} kb/s")
+    crf: float = fit_crf_for_bitrate(points, video_kbps)
+    print(f"Predicted CRF {crf:.2f} for {video_kbps} kb/s (tolerance +/-{DEFAULT_SIZE_TOLERANCE:.0%})")
+
+    cmd: List[str] = [
+        "ffmpeg", "-y", "-t", str(duration), "-i", input_file,
+        "-c:v", "libx265", "-crf", f"{crf:.2f}", "-preset", preset,
+        "-x265-params", X265_TUNING,
+        "-fps_mode", "cfr", "-r", fps_str
+    ]
+    if mute:
+        cmd += ["-an"]
+    else:
+        cmd += ["-c:a", "aac", "-b:a", "64k"]
+        if af_str is not None:
+            cmd += ["-af", af_str]
+    if vf_str is not None:
+        cmd += ["-vf", vf_str]
+    cmd.append(output_file)
+    print("\n=== FINAL: Encoding ===")
+    run_command(cmd, stage="compress:final")
+    return crf
 
 
 def compress_video(args) -> None:
@@ -38,58 +288,68 @@ def compress_video(args) -> None:
     video_kbps: int = calculate_bitrate_kbps(target_size_mb, effective_dur, audio_bps, DEFAULT_OVERHEAD,
                                              DEFAULT_MIN_VIDEO_KBPS)
     print(f"Target video bitrate: {video_kbps} kb/s")
-    vf_str: str = build_filter_string(resolution, denoise, speed)
+    vf_str: Optional[str] = build_filter_string(resolution, denoise, speed)
     out_for_preview: str = args.output
     if preview > 0:
         out_for_preview = f"preview_{args.output}"
         print(f"Preview: first {preview} seconds will be encoded to {out_for_preview}")
 
-    log_file: str = "x265_pass.log"
-    # First pass: analysis
-    pass1_cmd = [
-        "ffmpeg", "-y", "-i", args.input,
-        "-c:v", "libx265",
-        "-b:v", f"{video_kbps}k",
-        "-preset", preset,
-        "-x265-params", f"pass=1:stats={log_file}:me=star:subme=7:rc-lookahead=60:"
-                        "psy-rd=2.0:psy-rdoq=1.0:aq-mode=3:aq-strength=1.0:"
-                        "rdoq-level=2:bframes=5:ref=5",
-        "-fps_mode", "cfr",
-        "-r", fps_str,
-        "-an",
-        "-f", "null"
-    ]
-    if vf_str is not None:
-        pass1_cmd += ["-vf", vf_str]
-    if preview > 0:
-        pass1_cmd += ["-t", str(preview)]
-    pass1_cmd.append("/dev/null")
-    print("\n=== PASS 1: Analyzing ===")
-    run_command(pass1_cmd)
-
-    # Second pass: encoding
-    pass2_cmd = [
-        "ffmpeg", "-y", "-i", args.input,
-        "-c:v", "libx265",
-        "-b:v", f"{video_kbps}k",
-        "-preset", preset,
-        "-x265-params", f"pass=2:stats={log_file}:me=star:subme=7:rc-lookahead=60:"
-                        "psy-rd=2.0:psy-rdoq=1.0:aq-mode=3:aq-strength=1.0:"
-                        "rdoq-level=2:bframes=5:ref=5",
-        "-fps_mode", "cfr",
-        "-r", fps_str
-    ]
-    if mute:
-        pass2_cmd += ["-an"]
+    af_str: Optional[str] = None
+    if args.normalize and not mute and has_audio_stream(args.input):
+        af_str = normalize_audio_filter(args.input, preview if preview > 0 else None)
+
+    encode_duration: float = min(duration, preview) if preview > 0 else duration
+    graph_args: List[str] = ["-vf", vf_str] if vf_str is not None else []
+    if af_str is not None:
+        graph_args += ["-af", af_str]
+    if graph_args and not args.no_preflight:
+        preflight(["-i", args.input], graph_args, "compress")
+    use_samples: bool = args.fast and sampling_pays_off(encode_duration)
+    if args.fast and not use_samples:
+        print(f"--fast: {encode_duration:.1f}s is too short for sampling to beat a full analysis pass; "
+              "encoding without it")
+    if use_samples:
+        compress_sampled(args.input, out_for_preview, encode_duration, video_kbps, preset, fps_str, vf_str,
+                         mute, speed, af_str)
+    elif args.chunked:
+        jobs: int = args.jobs if args.jobs is not None else max(1, (os.cpu_count() or 1) // DEFAULT_CHUNK_CORES)
+        compress_chunked(args.input, out_for_preview, encode_duration, video_kbps, preset, fps_str, vf_str,
+                         mute, jobs, af_str)
     else:
-        pass2_cmd += ["-c:a", "aac", "-b:a", "64k"]
-    if vf_str is not None:
-        pass2_cmd += ["-vf", vf_str]
-    if preview > 0:
-        pass2_cmd += ["-t", str(preview)]
-    pass2_cmd.append(out_for_preview)
-    print("\n=== PASS 2: Encoding ===")
-    run_command(pass2_cmd)
+        stats_key: str = hash_key(file_identity(args.input), vf_str, preset, fps_str, preview)
+        log_file: Optional[str] = None if args.reanalyze else cached_x265_stats(stats_key)
+        with tempfile.TemporaryDirectory(prefix="ffmpeg_toy_x265_") as tmp_dir:
+            if log_file is not None:
+                print("\n=== PASS 1: Reusing cached x265 analysis ===")
+            else:
+                # First pass: analysis, into a per-job path so concurrent jobs never share a stats file
+                job_log: str = os.path.join(tmp_dir, "x265_pass.log")
+                pass1_cmd = x265_pass_cmd(args.input, 1, job_log, video_kbps, preset, fps_str)
+                pass1_cmd += ["-an", "-f", "null"]
+                if vf_str is not None:
+                    pass1_cmd += ["-vf", vf_str]
+                if preview > 0:
+                    pass1_cmd += ["-t", str(preview)]
+                pass1_cmd.append("/dev/null")
+                print("\n=== PASS 1: Analyzing ===")
+                run_command(pass1_cmd, stage="compress:pass1")
+                log_file = store_x265_stats(stats_key, job_log)
+
+            # Second pass: encoding
+            pass2_cmd = x265_pass_cmd(args.input, 2, log_file, video_kbps, preset, fps_str)
+            if mute:
+                pass2_cmd += ["-an"]
+            else:
+                pass2_cmd += ["-c:a", "aac", "-b:a", "64k"]
+                if af_str is not None:
+                    pass2_cmd += ["-af", af_str]
+            if vf_str is not None:
+                pass2_cmd += ["-vf", vf_str]
+            if preview > 0:
+                pass2_cmd += ["-t", str(preview)]
+            pass2_cmd.append(out_for_preview)
+            print("\n=== PASS 2: Encoding ===")
+            run_command(pass2_cmd, stage="compress:pass2")
 
     if not os.path.exists(out_for_preview):
         print(f"Error: Output file {out_for_preview} was not created.")
@@ -98,5 +358,9 @@ def compress_video(args) -> None:
     print("\n===== RESULTS =====")
     print(f"Output File: {out_for_preview}")
     print(f"Size: {out_size:.2f} MB")
+    if use_samples and preview == 0:
+        deviation: float = os.path.getsize(out_for_preview) / (target_size_mb * 1_000_000) - 1
+        within: str = "within" if abs(deviation) <= DEFAULT_SIZE_TOLERANCE else "OUTSIDE"
+        print(f"Target deviation: {deviation:+.1%} ({within} +/-{DEFAULT_SIZE_TOLERANCE:.0%} tolerance)")
     if preview > 0:
         print(f"\nPreview done => '{out_for_preview}'. Re-run without --preview for the full encode.\n")
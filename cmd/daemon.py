@@ -0,0 +1,266 @@
+import http.client
+import itertools
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+import urllib.error
+import urllib.request
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from cmd import cli
+from cmd.project import INPUT_FIELDS, step_argv, step_inputs
+from constants import (
+    DEFAULT_DAEMON_HOST, DEFAULT_DAEMON_PORT, DEFAULT_DAEMON_WORKERS, DEFAULT_DAEMON_KEEP_FINISHED
+)
+from utils.cache import content_hash, hash_key
+from utils.ffmpeg_utils import FFmpegError
+
+# Commands that manage their own scheduling and must not be nested inside a daemon job.
+_REJECTED_COMMANDS = {"serve", "submit", "run"}
+
+
+@dataclass
+class Job:
+    id: str
+    key: str
+    argv: List[str]
+    priority: int
+    state: str = "queued"
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    error: Optional[str] = None
+    duplicates: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id, "state": self.state, "argv": self.argv, "priority": self.priority,
+            "submitted": self.submitted, "started": self.started, "finished": self.finished,
+            "error": self.error, "duplicates": self.duplicates,
+        }
+
+
+class RenderQueue:
+    """
+    Priority queue of CLI jobs on a bounded worker pool. Jobs run in-process through the normal
+    argparse entry points, so imports, probe results and render caches stay warm between jobs.
+    A job whose argv and input contents match one already queued or running is collapsed into it.
+    Only the last DEFAULT_DAEMON_KEEP_FINISHED finished jobs are kept for status queries.
+    """
+
+    def __init__(self, workers: int):
+        self.parser = cli.build_parser()
+        self.jobs: Dict[str, Job] = {}
+        self.in_flight: Dict[str, Job] = {}
+        self.finished: "deque[str]" = deque()
+        self.lock = threading.Lock()
+        self.pending: "queue.PriorityQueue[Tuple[int, int, str]]" = queue.PriorityQueue()
+        self.seq = itertools.count()
+        self.ids = itertools.count(1)
+        for _ in range(workers):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def _job_key(self, argv: List[str]) -> str:
+        inputs: List[str] = step_inputs(self.parser.parse_args(argv))
+        return hash_key(argv, [(p, content_hash(p)) for p in inputs])
+
+    @staticmethod
+    def _command(argv: List[str]) -> str:
+        return next(token for token in argv if not token.startswith("--"))
+
+    def submit(self, argv: List[str], priority: int = 0) -> Tuple[Job, bool]:
+        """Queue argv (lower priority runs first). Returns (job, deduplicated)."""
+        key: str = self._job_key(argv)
+        with self.lock:
+            job: Optional[Job] = self.in_flight.get(key)
+            if job is not None:
+                job.duplicates += 1
+                if job.state == "queued" and priority < job.priority:
+                    # Re-queue at the higher priority; the stale entry is skipped by the workers.
+                    job.priority = priority
+                    self.pending.put((priority, next(self.seq), job.id))
+                return job, True
+            job = Job(id=f"job{next(self.ids)}", key=key, argv=argv, priority=priority)
+            self.jobs[job.id] = job
+            self.in_flight[key] = job
+            self.pending.put((priority, next(self.seq), job.id))
+        return job, False
+
+    def _worker(self) -> None:
+        while True:
+            priority, _, job_id = self.pending.get()
+            with self.lock:
+                job: Optional[Job] = self.jobs.get(job_id)
+                # Stale entries: re-queued at a higher priority, or already finished and pruned.
+                if job is None or job.state != "queued" or priority != job.priority:
+                    continue
+                job.state = "running"
+                job.started = time.time()
+            print(f"[{job.id}] running: {' '.join(job.argv)}")
+            state, error = "done", None
+            try:
+                job_args = self.parser.parse_args(job.argv)
+                job_args.func(job_args)
+            except FFmpegError as e:
+                state, error = "failed", str(e)
+            except SystemExit as e:
+                state, error = "failed", f"command exited with status {e.code}"
+            except Exception:
+                state, error = "failed", traceback.format_exc(limit=3)
+            with self.lock:
+                job.state, job.error, job.finished = state, error, time.time()
+                self.in_flight.pop(job.key, None)
+                self.finished.append(job.id)
+                while len(self.finished) > DEFAULT_DAEMON_KEEP_FINISHED:
+                    self.jobs.pop(self.finished.popleft(), None)
+            print(f"[{job.id}] {state} in {job.finished - job.started:.1f}s")
+
+    def snapshot(self, job_id: Optional[str] = None) -> Any:
+        """Consistent copy of one job (None if unknown) or, without job_id, of every job."""
+        with self.lock:
+            if job_id is None:
+                return [job.to_dict() for job in self.jobs.values()]
+            job: Optional[Job] = self.jobs.get(job_id)
+            return job.to_dict() if job is not None else None
+
+
+def _request_argv(body: Dict[str, Any]) -> List[str]:
+    """A job body is either {"argv": [...]} or a project-style step {"command", "input", "output", "options"}."""
+    if "argv" in body:
+        return [str(token) for token in body["argv"]]
+    return step_argv(body)
+
+
+def _make_handler(render_queue: RenderQueue):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, payload: Any) -> None:
+            data: bytes = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:
+            if self.path.rstrip("/") == "/jobs":
+                self._reply(200, render_queue.snapshot())
+                return
+            job: Optional[Dict[str, Any]] = render_queue.snapshot(self.path.rsplit("/", 1)[-1])
+            if job is None:
+                self._reply(404, {"error": "unknown job"})
+                return
+            self._reply(200, job)
+
+        def do_POST(self) -> None:
+            if self.path.rstrip("/") != "/jobs":
+                self._reply(404, {"error": "unknown endpoint"})
+                return
+            try:
+                body: Dict[str, Any] = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                argv: List[str] = _request_argv(body)
+                if RenderQueue._command(argv) in _REJECTED_COMMANDS:
+                    raise ValueError(f"'{RenderQueue._command(argv)}' cannot run as a daemon job")
+                render_queue.parser.parse_args(argv)
+                # Keying the job hashes its inputs, so a missing or unreadable input fails here.
+                job, deduplicated = render_queue.submit(argv, int(body.get("priority", 0)))
+            except SystemExit:
+                self._reply(400, {"error": "invalid arguments"})
+                return
+            except OSError as e:
+                self._reply(400, {"error": f"cannot read input {e.filename}: {e.strerror}"})
+                return
+            except (ValueError, KeyError, StopIteration, IndexError) as e:
+                self._reply(400, {"error": f"invalid job: {e}"})
+                return
+            self._reply(202, dict(render_queue.snapshot(job.id), deduplicated=deduplicated))
+
+        def log_message(self, fmt: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def serve(args) -> None:
+    """
+    Run a local render daemon on localhost: POST /jobs queues a job, GET /jobs[/<id>] reports status.
+    """
+    workers: int = args.workers if args.workers is not None else DEFAULT_DAEMON_WORKERS
+    port: int = args.port if args.port is not None else DEFAULT_DAEMON_PORT
+    render_queue = RenderQueue(workers)
+    server = ThreadingHTTPServer((DEFAULT_DAEMON_HOST, port), _make_handler(render_queue))
+    print(f"Render daemon listening on http://{DEFAULT_DAEMON_HOST}:{port} with {workers} worker(s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Render daemon stopped.")
+    finally:
+        server.server_close()
+
+
+def _call(port: int, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    data: Optional[bytes] = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(f"http://{DEFAULT_DAEMON_HOST}:{port}{path}", data=data, method=method,
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        print(f"Daemon rejected the job: {json.loads(e.read()).get('error')}")
+        sys.exit(1)
+    except urllib.error.URLError:
+        print(f"No render daemon on port {port}; start one with 'serve'.")
+        sys.exit(1)
+    except (http.client.HTTPException, ConnectionError) as e:
+        print(f"Lost the connection to the render daemon on port {port}: {e!r}")
+        sys.exit(1)
+
+
+def resolve_paths(argv: List[str], parser) -> List[str]:
+    """
+    Make every file argument of a sub-command absolute against this process's working directory:
+    inputs, the output (which need not exist yet), --audio, --cue-sheet and --mix files.
+    The argv is parsed first so only tokens the parser bound to those fields are rewritten.
+    """
+    job_args = parser.parse_args(argv)
+    paths: Set[str] = {getattr(job_args, name) for name in INPUT_FIELDS + ("output",)
+                       if getattr(job_args, name, None)}
+    paths |= {item[1] for item in getattr(job_args, "mix", None) or []}
+    resolved: List[str] = []
+    for token in argv:
+        flag, sep, value = token.partition("=")
+        if token in paths:
+            token = os.path.abspath(token)
+        elif flag.startswith("--") and sep and value in paths:
+            token = f"{flag}={os.path.abspath(value)}"
+        resolved.append(token)
+    return resolved
+
+
+def submit(args) -> None:
+    """Send a sub-command to a running daemon, optionally waiting for it to finish."""
+    port: int = args.port if args.port is not None else DEFAULT_DAEMON_PORT
+    argv: List[str] = args.job[1:] if args.job and args.job[0] == "--" else args.job
+    if not argv:
+        print("No job given, e.g. submit -- compress in.mp4 out.mp4 --size 10")
+        sys.exit(1)
+    # Relative paths are resolved here, not in the daemon's working directory.
+    argv = resolve_paths(argv, cli.build_parser())
+    job: Dict[str, Any] = _call(port, "POST", "/jobs", {"argv": argv, "priority": args.priority or 0})
+    note: str = " (joined an identical in-flight job)" if job["deduplicated"] else ""
+    print(f"Submitted {job['id']}{note}")
+    if not args.wait:
+        return
+    while job["state"] in ("queued", "running"):
+        time.sleep(0.5)
+        job = _call(port, "GET", f"/jobs/{job['id']}")
+    print(f"{job['id']} {job['state']}")
+    if job["state"] != "done":
+        print(job["error"])
+        sys.exit(1)
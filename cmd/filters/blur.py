@@ -6,63 +6,91 @@ from constants import (
 )
 
 
-def create_boxblur_filter(start, end, label, boxblur_val=None):
+def boxblur_filter_str(boxblur_val=None):
     val = boxblur_val if boxblur_val is not None else DEFAULT_BOXBLUR
+    return f"boxblur={val}" if val else "boxblur"
+
+
+def create_boxblur_filter(start, end, label, boxblur_val=None):
     return (
         f"[0:v]trim=start={start}:end={end},setpts=PTS-STARTPTS,"
-        f"boxblur={val}[{label}]"
+        f"{boxblur_filter_str(boxblur_val)}[{label}]"
     )
 
 
-def create_gblur_filter(start, end, label, gblur_val=None):
+def gblur_filter_str(gblur_val=None):
     val = gblur_val if gblur_val is not None else DEFAULT_GBLUR
+    return f"gblur={val}" if val else "gblur"
+
+
+def create_gblur_filter(start, end, label, gblur_val=None):
     return (
         f"[0:v]trim=start={start}:end={end},setpts=PTS-STARTPTS,"
-        f"gblur={val}[{label}]"
+        f"{gblur_filter_str(gblur_val)}[{label}]"
     )
 
 
-def create_smartblur_filter(start, end, label, sb_val=None):
+def smartblur_filter_str(sb_val=None):
     val = sb_val if sb_val is not None else DEFAULT_SMARTBLUR
+    return f"smartblur={val}" if val else "smartblur"
+
+
+def create_smartblur_filter(start, end, label, sb_val=None):
     return (
         f"[0:v]trim=start={start}:end={end},setpts=PTS-STARTPTS,"
-        f"smartblur={val}[{label}]"
+        f"{smartblur_filter_str(sb_val)}[{label}]"
     )
 
 
-def create_edgedetect_filter(start, end, label, ed_val=None):
+def edgedetect_filter_str(ed_val=None):
     val = ed_val if ed_val is not None else DEFAULT_EDGEDETECT
+    return f"edgedetect={val}" if val else "edgedetect"
+
+
+def create_edgedetect_filter(start, end, label, ed_val=None):
     return (
         f"[0:v]trim=start={start}:end={end},setpts=PTS-STARTPTS,"
-        f"edgedetect={val}[{label}]"
+        f"{edgedetect_filter_str(ed_val)}[{label}]"
     )
 
 
-def create_sobel_filter(start, end, label, sobel_val=None):
+def sobel_filter_str(sobel_val=None):
     val = sobel_val if sobel_val is not None else DEFAULT_SOBEL
+    return f"sobel={val}" if val else "sobel"
+
+
+def create_sobel_filter(start, end, label, sobel_val=None):
     return (
         f"[0:v]trim=start={start}:end={end},setpts=PTS-STARTPTS,"
-        f"sobel={val}[{label}]"
+        f"{sobel_filter_str(sobel_val)}[{label}]"
     )
 
 
-def create_unsharp_filter(start, end, label, unsharp_val=None):
+def unsharp_filter_str(unsharp_val=None):
     val = unsharp_val if unsharp_val is not None else DEFAULT_UNSHARP
+    return f"unsharp={val}" if val else "unsharp"
+
+
+def create_unsharp_filter(start, end, label, unsharp_val=None):
     return (
         f"[0:v]trim=start={start}:end={end},setpts=PTS-STARTPTS,"
-        f"unsharp={val}[{label}]"
+        f"{unsharp_filter_str(unsharp_val)}[{label}]"
     )
 
 
-def create_delogo_filter(start, end, label,
-                         x=None, y=None, w=None, h=None, show=None):
+def delogo_filter_str(x=None, y=None, w=None, h=None, show=None):
     d = DEFAULT_DELOGO
     xx = x if x is not None else d["x"]
     yy = y if y is not None else d["y"]
     ww = w if w is not None else d["w"]
     hh = h if h is not None else d["h"]
     sh = show if show is not None else d["show"]
+    return f"delogo=x={xx}:y={yy}:w={ww}:h={hh}:show={sh}"
+
+
+def create_delogo_filter(start, end, label,
+                         x=None, y=None, w=None, h=None, show=None):
     return (
         f"[0:v]trim=start={start}:end={end},setpts=PTS-STARTPTS,"
-        f"delogo=x={xx}:y={yy}:w={ww}:h={hh}:show={sh}[{label}]"
+        f"{delogo_filter_str(x, y, w, h, show)}[{label}]"
     )
@@ -2,21 +2,24 @@
 from constants import (DEFAULT_COLORBALANCE, DEFAULT_COLORCHANNELMIXER, DEFAULT_CURVES, DEFAULT_EQ)
 
 
-def create_colorbalance_filter(start, end, label, rs=None, gs=None, bs=None):
+def colorbalance_filter_str(rs=None, gs=None, bs=None):
     cfg = DEFAULT_COLORBALANCE
     rs = rs if rs is not None else cfg["rs"]
     gs = gs if gs is not None else cfg["gs"]
     bs = bs if bs is not None else cfg["bs"]
+    return f"colorbalance=rs={rs}:gs={gs}:bs={bs}"
+
+
+def create_colorbalance_filter(start, end, label, rs=None, gs=None, bs=None):
     return (
         f"[0:v]trim=start={start}:end={end},setpts=PTS-STARTPTS,"
-        f"colorbalance=rs={rs}:gs={gs}:bs={bs}[{label}]"
+        f"{colorbalance_filter_str(rs, gs, bs)}[{label}]"
     )
 
 
-def create_colorchannelmixer_filter(start, end, label,
-                                    rr=None, rg=None, rb=None,
-                                    gr=None, gg=None, gb=None,
-                                    br=None, bg=None, bb=None):
+def colorchannelmixer_filter_str(rr=None, rg=None, rb=None,
+                                 gr=None, gg=None, gb=None,
+                                 br=None, bg=None, bb=None):
     d = DEFAULT_COLORCHANNELMIXER
     rr = rr if rr is not None else d["rr"]
     rg = rg if rg is not None else d["rg"]
@@ -28,30 +31,48 @@ def create_colorchannelmixer_filter(start, end, label,
     bg = bg if bg is not None else d["bg"]
     bb = bb if bb is not None else d["bb"]
     return (
-        f"[0:v]trim=start={start}:end={end},setpts=PTS-STARTPTS,"
         f"colorchannelmixer=rr={rr}:rg={rg}:rb={rb}:"
         f"gr={gr}:gg={gg}:gb={gb}:br={br}:bg={bg}:bb={bb}"
-        f"[{label}]"
     )
 
 
-def create_curves_filter(start, end, label, curves=None):
+def create_colorchannelmixer_filter(start, end, label,
+                                    rr=None, rg=None, rb=None,
+                                    gr=None, gg=None, gb=None,
+                                    br=None, bg=None, bb=None):
+    return (
+        f"[0:v]trim=start={start}:end={end},setpts=PTS-STARTPTS,"
+        f"{colorchannelmixer_filter_str(rr, rg, rb, gr, gg, gb, br, bg, bb)}[{label}]"
+    )
+
+
+def curves_filter_str(curves=None):
+    """Returns None when there is no curve to apply."""
     curves = curves if curves is not None else DEFAULT_CURVES
-    if not curves:
+    return f"curves={curves}" if curves else None
+
+
+def create_curves_filter(start, end, label, curves=None):
+    body = curves_filter_str(curves)
+    if body is None:
         return f"[0:v]trim=start={start}:end={end},setpts=PTS-STARTPTS[{label}]"
     return (
         f"[0:v]trim=start={start}:end={end},setpts=PTS-STARTPTS,"
-        f"curves={curves}[{label}]"
+        f"{body}[{label}]"
     )
 
 
-def create_eq_filter(start, end, label, brightness=None, contrast=None, gamma=None, saturation=None):
+def eq_filter_str(brightness=None, contrast=None, gamma=None, saturation=None):
     d = DEFAULT_EQ
     b = brightness if brightness is not None else d["brightness"]
     c = contrast if contrast is not None else d["contrast"]
     g = gamma if gamma is not None else d["gamma"]
     s = saturation if saturation is not None else d["saturation"]
+    return f"eq=brightness={b}:contrast={c}:gamma={g}:saturation={s}"
+
+
+def create_eq_filter(start, end, label, brightness=None, contrast=None, gamma=None, saturation=None):
     return (
         f"[0:v]trim=start={start}:end={end},setpts=PTS-STARTPTS,"
-        f"eq=brightness={b}:contrast={c}:gamma={g}:saturation={s}[{label}]"
+        f"{eq_filter_str(brightness, contrast, gamma, saturation)}[{label}]"
     )
@@ -1,4 +1,4 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from cmd.filters.colors import (
     create_colorbalance_filter, create_colorchannelmixer_filter,
@@ -35,12 +35,14 @@ def parse_effect_items(effect_list: List[List[str]]) -> List[Tuple[float, float,
     return items
 
 
-def create_filter_complex(input_file: str, effect_items: List[Tuple[float, float, str, List[str]]]) -> str:
+def create_filter_complex(input_file: str, effect_items: List[Tuple[float, float, str, List[str]]],
+                          video_duration: Optional[float] = None) -> str:
     filter_complex_parts = []
     seg_count = 0
     current_time = 0.0
 
-    video_duration = get_video_metadata(input_file)[0] or 0.0
+    if video_duration is None:
+        video_duration = get_video_metadata(input_file)[0] or 0.0
 
     for (start_time, end_time, effect_type, params) in effect_items:
         if current_time < start_time:
@@ -1,5 +1,14 @@
+import os
+
+from constants import DEFAULT_RENDER_CACHE_MB, DEFAULT_PROXY_ENCODE
 from cmd.filters.effects_engine import parse_effect_items, create_filter_complex
+from cmd.filters.linear_engine import create_linear_filter_complex
+from cmd.filters.proxy_params import scale_effect_items
+from cmd.filters.smart_render import render_smart
+from cmd.filters.variants import parse_variants, render_variants
 from utils.ffmpeg_utils import run_command, copy_file
+from utils.preflight import preflight
+from utils.proxy import build_proxy
 
 
 def apply_filters(args) -> None:
@@ -8,21 +17,46 @@ def apply_filters(args) -> None:
         return
 
     effect_items = parse_effect_items(args.effect)
+    video_encode = ["-c:v", "libx265"]
+    if args.proxy:
+        # Preview: same graph on the cached proxy with pixel parameters rescaled; drop --proxy for the final.
+        args.input, scale = build_proxy(args.input)
+        effect_items = scale_effect_items(effect_items, scale)
+        video_encode = DEFAULT_PROXY_ENCODE
+        print(f"Proxy preview at {scale:.3f}x scale")
+
+    if args.variant:
+        print("Variants: one decode split into per-variant linear effect chains")
+        render_variants(args.input, args.output, effect_items, parse_variants(args.variant), not args.no_audio,
+                        not args.no_preflight, video_encode)
+        return
+
+    if args.render == "smart":
+        print("Smart render: copying untouched ranges, encoding effect ranges")
+        jobs = args.jobs if args.jobs is not None else os.cpu_count() or 1
+        cache_mb = args.cache_size if args.cache_size is not None else DEFAULT_RENDER_CACHE_MB
+        render_smart(args.input, args.output, effect_items, not args.no_audio, jobs, cache_mb, not args.no_preflight)
+        return
 
-    filter_complex = create_filter_complex(args.input, effect_items)
+    if args.backend == "linear":
+        filter_complex = create_linear_filter_complex(effect_items)
+    else:
+        filter_complex = create_filter_complex(args.input, effect_items)
     print("Constructed filter_complex:")
     print(filter_complex)
+    if not args.no_preflight:
+        preflight(["-i", args.input], ["-filter_complex", filter_complex, "-map", "[outv]"], "effects")
 
     cmd = [
         "ffmpeg", "-y",
         "-i", args.input,
         "-filter_complex", filter_complex,
         "-map", "[outv]",
-        "-c:v", "libx265",
-    ]
+    ] + video_encode
 
     if not args.no_audio:
         cmd.extend(["-map", "0:a?", "-c:a", "copy"])
 
     cmd.append(args.output)
-    run_command(cmd)
+    metrics = run_command(cmd, stage=f"effects:{args.backend}")
+    print(f"Peak ffmpeg RSS ({args.backend} backend): {metrics['peak_rss_kib'] / 1024:.1f} MiB")
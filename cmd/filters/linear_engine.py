@@ -0,0 +1,173 @@
+import sys
+from typing import List, Optional, Tuple
+
+from constants import DEFAULT_FADE, DEFAULT_OVERLAY
+from cmd.filters.blur import (
+    boxblur_filter_str, gblur_filter_str, smartblur_filter_str, edgedetect_filter_str,
+    sobel_filter_str, unsharp_filter_str, delogo_filter_str
+)
+from cmd.filters.colors import (
+    colorbalance_filter_str, colorchannelmixer_filter_str, curves_filter_str, eq_filter_str
+)
+from cmd.filters.data_display import drawtext_filter_str
+from cmd.filters.overlays import _build_blend_expression, _build_effect_chain
+from cmd.filters.transformations import lenscorrection_filter_str, perspective_filter_str
+
+EffectItem = Tuple[float, float, str, List[str]]
+
+# Filters that change frame size cannot be gated with enable= and need the trim/concat backend.
+UNSUPPORTED_LINEAR = ("scale", "transpose")
+
+
+def _between(start: float, end: float) -> str:
+    return f"enable='between(t\\,{start}\\,{end})'"
+
+
+def _gate(filter_str: str, start: float, end: float) -> str:
+    """Append a timeline enable= option to a single 'name[=args]' filter."""
+    sep: str = ":" if "=" in filter_str else "="
+    return f"{filter_str}{sep}{_between(start, end)}"
+
+
+def _simple_filter(effect_type: str, params: List[str]) -> Optional[str]:
+    """
+    Ungated filter body for effects that map onto one timeline-capable filter.
+    Parameters are read as in create_filter_complex and the filter strings come from the same
+    builders, so both backends render an effect identically.
+    """
+    if effect_type == "boxblur":
+        return boxblur_filter_str(params[0] if params else None)
+    if effect_type == "gblur":
+        return gblur_filter_str(params[0] if params else None)
+    if effect_type == "smartblur":
+        return smartblur_filter_str(params[0] if params else None)
+    if effect_type == "edgedetect":
+        return edgedetect_filter_str(params[0] if params else None)
+    if effect_type == "sobel":
+        return sobel_filter_str(params[0] if params else None)
+    if effect_type == "unsharp":
+        return unsharp_filter_str(params[0] if params else None)
+    if effect_type == "delogo":
+        show = int(params[4]) if len(params) > 4 else None
+        return delogo_filter_str(int(params[0]), int(params[1]), int(params[2]), int(params[3]), show)
+    if effect_type == "lenscorrection":
+        k1 = float(params[0]) if len(params) > 0 else None
+        k2 = float(params[1]) if len(params) > 1 else None
+        return lenscorrection_filter_str(k1, k2)
+    if effect_type == "perspective":
+        return perspective_filter_str(*map(int, params[:8]))
+    if effect_type == "colorbalance":
+        return colorbalance_filter_str(float(params[0]), float(params[1]), float(params[2]))
+    if effect_type == "colorchannelmixer":
+        return colorchannelmixer_filter_str(*map(float, params[:9]))
+    if effect_type == "curves":
+        return curves_filter_str(params[0] if params else None)
+    if effect_type == "eq":
+        return eq_filter_str(float(params[0]), float(params[1]), float(params[2]), float(params[3]))
+    if effect_type == "drawtext":
+        text_ = params[0] if params else None
+        x_ = params[1] if len(params) > 1 else None
+        y_ = params[2] if len(params) > 2 else None
+        fontsize_ = int(params[3]) if len(params) > 3 else None
+        fontcolor_ = params[4] if len(params) > 4 else None
+        return drawtext_filter_str(text_, x_, y_, fontsize_, fontcolor_)
+    return None
+
+
+def _overlay_source(label: str, tag: str, opacity: Optional[float]) -> Tuple[str, str]:
+    """
+    Return (filter prefix, label) for the overlaid copy. Opacity is applied as alpha on that copy
+    only, so the main chain keeps its pixel format (overlay format=auto follows the base).
+    """
+    if opacity is None:
+        return "", label
+    return f"{label}format=yuva420p,colorchannelmixer=aa={opacity}[{tag}a]; ", f"[{tag}a]"
+
+
+def create_linear_filter_complex(effect_items: List[EffectItem], source: str = "[0:v]",
+                                 out_label: str = "outv", prefix: str = "") -> str:
+    """
+    Compile effect items into one linear chain over source, gating every filter with
+    enable='between(t,start,end)' instead of trimming each segment into its own branch.
+    Only overlay, dualoverlay and blend use split, because they need a second copy of the frame.
+    Every filter sees every frame, so long timelines render slower than with the concat backend;
+    peak memory is about the same, as both grow with the number of filters in the graph.
+    prefix keeps internal labels unique when several chains share one filter graph.
+    """
+    parts: List[str] = []
+    current: str = source
+    step: int = 0
+
+    def next_label() -> str:
+        nonlocal step
+        step += 1
+        return f"[{prefix}v{step}]"
+
+    for (start, end, effect_type, params) in effect_items:
+        if effect_type in UNSUPPORTED_LINEAR:
+            print(f"Effect '{effect_type}' changes frame size and needs the concat backend (--backend concat).")
+            sys.exit(1)
+
+        if effect_type == "fade":
+            fade_type = params[0] if params else DEFAULT_FADE["type"]
+            fade_dur = float(params[1]) if len(params) > 1 else DEFAULT_FADE["duration"]
+            out = next_label()
+            fade = f"fade=type={fade_type}:st={start}:d={fade_dur}"
+            parts.append(f"{current}{_gate(fade, start, end)}{out}")
+            current = out
+
+        elif effect_type == "overlay":
+            x_expr = params[0] if len(params) > 0 else DEFAULT_OVERLAY["x"]
+            y_expr = params[1] if len(params) > 1 else DEFAULT_OVERLAY["y"]
+            opacity = float(params[2]) if len(params) >= 3 else None
+            tag, out = f"{prefix}s{step}", next_label()
+            alpha, ovl = _overlay_source(f"[{tag}o]", tag, opacity)
+            parts.append(
+                f"{current}split[{tag}b][{tag}o]; {alpha}"
+                f"[{tag}b]{ovl}overlay=x={x_expr}:y={y_expr}:format=auto:{_between(start, end)}{out}"
+            )
+            current = out
+
+        elif effect_type == "dualoverlay":
+            left_x, right_x = params[0], params[1]
+            opacity = float(params[2]) if len(params) >= 3 else 1.0
+            tag, out = f"{prefix}s{step}", next_label()
+            gate = _between(start, end)
+            left_alpha, left_ovl = _overlay_source(f"[{tag}lo]", f"{tag}l", opacity)
+            right_alpha, right_ovl = _overlay_source(f"[{tag}ro]", f"{tag}r", opacity)
+            parts.append(
+                f"{current}split=4[{tag}lb][{tag}lo][{tag}rb][{tag}ro]; {left_alpha}{right_alpha}"
+                f"[{tag}lb]{left_ovl}overlay=x={left_x}:y=0:format=auto:{gate}[{tag}l]; "
+                f"[{tag}rb]{right_ovl}overlay=x={right_x}:y=0:format=auto:{gate}[{tag}r]; "
+                f"[{tag}l][{tag}r]blend=all_expr='0.5*A+0.5*B':{gate}{out}"
+            )
+            current = out
+
+        elif effect_type == "blend":
+            phase = int(params[0])
+            # Blend cross times are relative to the segment; T is absolute in a single chain.
+            cross_params = [str(float(p) + start) for p in params[1:] if "=" not in p]
+            overrides = {p.split("=", 1)[0]: p.split("=", 1)[1] for p in params[1:] if "=" in p}
+            expr = _build_blend_expression(phase, cross_params)
+            # Only the blend is gated: outside the range it passes the untouched copy through,
+            # and override filters need not support timeline editing.
+            chain = _build_effect_chain(overrides).lstrip(",")
+            tag, out = f"{prefix}s{step}", next_label()
+            fx = f"[{tag}f]{chain}[{tag}x]; " if chain else ""
+            fx_label = f"[{tag}x]" if chain else f"[{tag}f]"
+            parts.append(
+                f"{current}split[{tag}o][{tag}f]; {fx}"
+                f"[{tag}o]{fx_label}blend=all_expr='{expr}':{_between(start, end)}{out}"
+            )
+            current = out
+
+        else:
+            body = _simple_filter(effect_type, params)
+            if body is None:
+                continue
+            out = next_label()
+            parts.append(f"{current}{_gate(body, start, end)}{out}")
+            current = out
+
+    parts.append(f"{current}null[{out_label}]")
+    return "; ".join(parts)
@@ -0,0 +1,50 @@
+from typing import Dict, List, Tuple
+
+EffectItem = Tuple[float, float, str, List[str]]
+
+# Positions of pixel-valued parameters per effect type.
+PIXEL_PARAMS: Dict[str, List[int]] = {
+    "overlay": [0, 1],
+    "dualoverlay": [0, 1],
+    "delogo": [0, 1, 2, 3],
+    "perspective": [0, 1, 2, 3, 4, 5, 6, 7],
+    "drawtext": [1, 2, 3],
+    "scale": [0, 1],
+}
+# Blend overrides given as key=value whose values are pixel offsets.
+PIXEL_OVERRIDES = {"rgbashift_rh", "rgbashift_rv", "rgbashift_gh", "rgbashift_gv", "rgbashift_bh", "rgbashift_bv"}
+
+
+def _scale_value(value: str, scale: float) -> str:
+    """
+    Scale a numeric pixel value. Expressions (e.g. W-w-10) are left alone: they are written
+    against the frame size, which already shrinks with the proxy. Negative sizes such as
+    scale's -1/-2 are "keep aspect" markers, not pixels.
+    """
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    if number < 0 and value.lstrip("-") in ("1", "2"):
+        return value
+    scaled = round(number * scale)
+    return str(scaled if scaled != 0 or number == 0 else (1 if number > 0 else -1))
+
+
+def scale_effect_items(effect_items: List[EffectItem], scale: float) -> List[EffectItem]:
+    """Rescale the pixel-based parameters of parsed effect items for a proxy scaled by `scale`."""
+    if scale == 1.0:
+        return effect_items
+    scaled_items: List[EffectItem] = []
+    for start, end, effect_type, params in effect_items:
+        params = list(params)
+        for idx in PIXEL_PARAMS.get(effect_type, []):
+            if idx < len(params):
+                params[idx] = _scale_value(params[idx], scale)
+        if effect_type == "blend":
+            for idx, param in enumerate(params):
+                key, sep, value = param.partition("=")
+                if sep and key in PIXEL_OVERRIDES:
+                    params[idx] = f"{key}={_scale_value(value, scale)}"
+        scaled_items.append((start, end, effect_type, params))
+    return scaled_items
@@ -0,0 +1,178 @@
+import bisect
+import os
+import sys
+import tempfile
+from typing import List, Optional, Tuple
+
+from cmd.filters.effects_engine import create_filter_complex
+from utils.cache import cache_dir, cached_file, evict_lru, file_identity, hash_key
+from utils.executor import run_parallel
+from utils.ffmpeg_utils import run_command
+from utils.metadata import probe, get_keyframe_times, MediaInfo, StreamInfo
+from utils.preflight import preflight
+from utils.smart_cut import copy_args_for, encode_args_for, piece_suffix, verify_decode
+
+EffectItem = Tuple[float, float, str, List[str]]
+
+
+def plan_render_ranges(keyframes: List[float], duration: float,
+                       effect_items: List[EffectItem]) -> List[Tuple[float, float, List[EffectItem]]]:
+    """
+    Cover [0, duration) with ranges that start and end on keyframes.
+    Each effect is widened outward to the surrounding keyframes and overlapping effects are merged,
+    so the gaps between them can be stream-copied. Ranges with no items are copy ranges.
+    """
+    widened: List[Tuple[float, float, List[EffectItem]]] = []
+    for item in effect_items:
+        start, end = item[0], item[1]
+        i: int = bisect.bisect_right(keyframes, start) - 1
+        j: int = bisect.bisect_left(keyframes, end)
+        range_start: float = keyframes[i] if i >= 0 else 0.0
+        range_end: float = keyframes[j] if j < len(keyframes) else duration
+        if widened and range_start <= widened[-1][1]:
+            prev_start, prev_end, prev_items = widened[-1]
+            widened[-1] = (prev_start, max(prev_end, range_end), prev_items + [item])
+        else:
+            widened.append((range_start, range_end, [item]))
+
+    ranges: List[Tuple[float, float, List[EffectItem]]] = []
+    current: float = 0.0
+    for range_start, range_end, items in widened:
+        if range_start > current:
+            ranges.append((current, range_start, []))
+        ranges.append((range_start, range_end, items))
+        current = range_end
+    if duration > current:
+        ranges.append((current, duration, []))
+    return ranges
+
+
+def _piece_command(input_file: str, video: StreamInfo, piece_file: str, range_start: float, range_end: float,
+                   items: List[EffectItem], use_cache: bool) -> Tuple[Optional[List[str]], str, Optional[str]]:
+    """
+    Plan one range: return (command, or None on a render cache hit; file it writes; cache file to
+    move that file to once it succeeds, if any).
+    Encoded ranges are content-addressed by input identity, time range, filter graph and encoder
+    settings, so an unchanged range is served from the render cache instead of being re-encoded.
+    """
+    length: float = range_end - range_start
+    cmd: List[str] = [
+        "ffmpeg", "-y",
+        "-ss", str(range_start),
+        "-i", input_file,
+        "-t", str(length)
+    ]
+    if not items:
+        return cmd + ["-map", "0:v:0"] + copy_args_for(video) + ["-an", piece_file], piece_file, None
+
+    shifted: List[EffectItem] = [
+        (start - range_start, end - range_start, effect_type, params)
+        for start, end, effect_type, params in items
+    ]
+    filter_complex: str = create_filter_complex(input_file, shifted, length)
+    encode_args: List[str] = encode_args_for(video)
+    cmd += ["-filter_complex", filter_complex, "-map", "[outv]"] + encode_args + ["-an"]
+    if not use_cache:
+        return cmd + [piece_file], piece_file, None
+    key: str = hash_key(file_identity(input_file), range_start, range_end, filter_complex, encode_args)
+    hit: Optional[str] = cached_file("segments", key, piece_suffix(video))
+    if hit is not None:
+        print(f"  {range_start:.3f}s-{range_end:.3f}s: render cache hit")
+        return None, hit, None
+    # Render to a unique name inside the cache dir and rename into place: the rename is atomic
+    # on the same filesystem, so concurrent readers never see a partial file.
+    directory: str = cache_dir("segments")
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=piece_suffix(video))
+    os.close(fd)
+    return cmd + [tmp_path], tmp_path, os.path.join(directory, f"{key}{piece_suffix(video)}")
+
+
+def _render_pieces(pieces: List[Tuple[Optional[List[str]], str, Optional[str]]], jobs: int) -> List[str]:
+    """
+    Run the planned piece commands at most jobs at a time, splitting the machine's cores between
+    them so every encoder gets a matching thread budget, and return the file holding each piece.
+    """
+    cmds: List[List[str]] = [cmd for cmd, _, _ in pieces if cmd is not None]
+    parallel: int = max(1, min(jobs, len(cmds)))
+    cores_per_job: int = max(1, (os.cpu_count() or 1) // parallel)
+    try:
+        if cmds:
+            run_parallel(cmds, cores_per_job=cores_per_job, core_budget=cores_per_job * parallel,
+                         stages=[f"smart_render:piece{n}" for n, (cmd, _, _) in enumerate(pieces) if cmd is not None])
+        for _, path, cache_file in pieces:
+            if cache_file is not None:
+                os.replace(path, cache_file)
+    finally:
+        for _, path, cache_file in pieces:
+            if cache_file is not None and os.path.exists(path):
+                os.remove(path)
+    return [cache_file or path for _, path, cache_file in pieces]
+
+
+def _render_full(input_file: str, output_file: str, video: StreamInfo, effect_items: List[EffectItem],
+                 duration: float, keep_audio: bool) -> None:
+    cmd: List[str] = [
+        "ffmpeg", "-y", "-i", input_file,
+        "-filter_complex", create_filter_complex(input_file, effect_items, duration),
+        "-map", "[outv]"
+    ] + encode_args_for(video)
+    if keep_audio:
+        cmd += ["-map", "0:a?", "-c:a", "copy"]
+    cmd.append(output_file)
+    run_command(cmd, stage="smart_render:fallback")
+
+
+def render_smart(input_file: str, output_file: str, effect_items: List[EffectItem],
+                 keep_audio: bool, jobs: int, cache_size_mb: int, check_graph: bool = True) -> None:
+    """
+    Stream-copy untouched ranges on keyframe boundaries and encode only the effect ranges,
+    up to jobs at a time under the shared core budget, then join the pieces with the concat demuxer.
+    Pieces carry their own parameter sets (see utils.smart_cut); the joined file is decoded once
+    and the whole file is rendered normally if that check fails.
+    A cache_size_mb of 0 disables the segment render cache. check_graph validates the effect graph
+    over the whole timeline on a short sample before any piece is encoded; pieces use the same filters.
+    """
+    use_cache: bool = cache_size_mb > 0
+    info: MediaInfo = probe(input_file)
+    video: Optional[StreamInfo] = info.video
+    if video is None or info.duration is None:
+        print(f"Error: {input_file} has no video stream to render.")
+        sys.exit(1)
+    if check_graph:
+        preflight(["-i", input_file],
+                  ["-filter_complex", create_filter_complex(input_file, effect_items, info.duration), "-map", "[outv]"],
+                  "effects:smart")
+    ranges = plan_render_ranges(get_keyframe_times(input_file), info.duration, effect_items)
+    for range_start, range_end, items in ranges:
+        mode: str = f"encode ({len(items)} effects)" if items else "copy"
+        print(f"  {range_start:.3f}s-{range_end:.3f}s: {mode}")
+
+    with tempfile.TemporaryDirectory(prefix="ffmpeg_toy_render_") as tmp_dir:
+        piece_files: List[str] = [os.path.join(tmp_dir, f"piece_{n}{piece_suffix(video)}") for n in range(len(ranges))]
+        piece_files = _render_pieces([_piece_command(input_file, video, piece_file, range_start, range_end, items,
+                                                     use_cache)
+                                      for piece_file, (range_start, range_end, items) in zip(piece_files, ranges)],
+                                     jobs)
+
+        concat_list_file: str = os.path.join(tmp_dir, "concat_list.txt")
+        with open(concat_list_file, "w", encoding="utf-8") as f:
+            for piece_file in piece_files:
+                f.write(f"file '{piece_file}'\n")
+
+        cmd: List[str] = [
+            "ffmpeg", "-y",
+            "-f", "concat", "-safe", "0", "-i", concat_list_file,
+            "-i", input_file,
+            "-map", "0:v", "-c:v", "copy"
+        ]
+        if keep_audio:
+            cmd += ["-map", "1:a?", "-c:a", "copy"]
+        cmd.append(output_file)
+        run_command(cmd)
+
+    if not verify_decode(output_file, "smart_render"):
+        print("Smart render output failed to decode cleanly; rendering the whole file instead.")
+        _render_full(input_file, output_file, video, effect_items, info.duration, keep_audio)
+
+    if use_cache:
+        evict_lru("segments", cache_size_mb * 1024 * 1024)
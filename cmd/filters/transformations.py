@@ -11,38 +11,49 @@ def create_fade_filter(start, end, label, fade_type=None, duration=None):
     )
 
 
-def create_scale_filter(start, end, label, w=None, h=None):
+def scale_filter_str(w=None, h=None):
     d = DEFAULT_SCALE
     ww = w if w is not None else d["w"]
     hh = h if h is not None else d["h"]
+    return f"scale={ww}:{hh}"
+
+
+def create_scale_filter(start, end, label, w=None, h=None):
     return (
         f"[0:v]trim=start={start}:end={end},setpts=PTS-STARTPTS,"
-        f"scale={ww}:{hh}[{label}]"
+        f"{scale_filter_str(w, h)}[{label}]"
     )
 
 
-def create_transpose_filter(start, end, label, direction=None):
+def transpose_filter_str(direction=None):
     d = DEFAULT_TRANSPOSE
     dir_ = direction if direction is not None else d["dir"]
+    return f"transpose={dir_}"
+
+
+def create_transpose_filter(start, end, label, direction=None):
     return (
         f"[0:v]trim=start={start}:end={end},setpts=PTS-STARTPTS,"
-        f"transpose={dir_}[{label}]"
+        f"{transpose_filter_str(direction)}[{label}]"
     )
 
 
-def create_lenscorrection_filter(start, end, label, k1=None, k2=None):
+def lenscorrection_filter_str(k1=None, k2=None):
     d = DEFAULT_LENSCORRECTION
     k1_ = k1 if k1 is not None else d["k1"]
     k2_ = k2 if k2 is not None else d["k2"]
+    return f"lenscorrection=k1={k1_}:k2={k2_}"
+
+
+def create_lenscorrection_filter(start, end, label, k1=None, k2=None):
     return (
         f"[0:v]trim=start={start}:end={end},setpts=PTS-STARTPTS,"
-        f"lenscorrection=k1={k1_}:k2={k2_}[{label}]"
+        f"{lenscorrection_filter_str(k1, k2)}[{label}]"
     )
 
 
-def create_perspective_filter(start, end, label,
-                              x0=None, y0=None, x1=None, y1=None,
-                              x2=None, y2=None, x3=None, y3=None):
+def perspective_filter_str(x0=None, y0=None, x1=None, y1=None,
+                           x2=None, y2=None, x3=None, y3=None):
     d = DEFAULT_PERSPECTIVE
     xx0 = x0 if x0 is not None else d["x0"]
     yy0 = y0 if y0 is not None else d["y0"]
@@ -53,8 +64,16 @@ def create_perspective_filter(start, end, label,
     xx3 = x3 if x3 is not None else d["x3"]
     yy3 = y3 if y3 is not None else d["y3"]
     return (
-        f"[0:v]trim=start={start}:end={end},setpts=PTS-STARTPTS,"
         f"perspective="
         f"x0={xx0}:y0={yy0}:x1={xx1}:y1={yy1}:"
-        f"x2={xx2}:y2={yy2}:x3={xx3}:y3={yy3}[{label}]"
+        f"x2={xx2}:y2={yy2}:x3={xx3}:y3={yy3}"
+    )
+
+
+def create_perspective_filter(start, end, label,
+                              x0=None, y0=None, x1=None, y1=None,
+                              x2=None, y2=None, x3=None, y3=None):
+    return (
+        f"[0:v]trim=start={start}:end={end},setpts=PTS-STARTPTS,"
+        f"{perspective_filter_str(x0, y0, x1, y1, x2, y2, x3, y3)}[{label}]"
     )
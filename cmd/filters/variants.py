@@ -0,0 +1,68 @@
+import os
+from typing import Dict, List, Optional, Tuple
+
+from cmd.filters.linear_engine import create_linear_filter_complex
+from utils.ffmpeg_utils import run_command
+from utils.preflight import preflight
+
+EffectItem = Tuple[float, float, str, List[str]]
+
+
+def parse_variants(variant_list: List[List[str]]) -> List[Tuple[str, Dict[str, str]]]:
+    """Parse --variant NAME key=value... items into (name, blend overrides) pairs."""
+    variants = []
+    for item in variant_list:
+        name = item[0]
+        overrides = {p.split("=", 1)[0]: p.split("=", 1)[1] for p in item[1:] if "=" in p}
+        variants.append((name, overrides))
+    return variants
+
+
+def apply_variant(effect_items: List[EffectItem], overrides: Dict[str, str]) -> List[EffectItem]:
+    """Replace the overrides of every blend effect, keeping its phase and crossfade times."""
+    items = []
+    for start, end, effect_type, params in effect_items:
+        if effect_type == "blend":
+            kept = [params[0]] + [p for p in params[1:] if "=" not in p]
+            params = kept + [f"{k}={v}" for k, v in overrides.items()]
+        items.append((start, end, effect_type, params))
+    return items
+
+
+def variant_output_path(output: str, name: str) -> str:
+    base, ext = os.path.splitext(output)
+    return f"{base}_{name}{ext}"
+
+
+def render_variants(input_file: str, output: str, effect_items: List[EffectItem],
+                    variants: List[Tuple[str, Dict[str, str]]], keep_audio: bool, check_graph: bool = True,
+                    video_encode: Optional[List[str]] = None) -> None:
+    """
+    Render every variant from one decode: [0:v] is split once into N linear effect chains,
+    and each chain is encoded to its own output by the same ffmpeg process.
+    check_graph validates the combined graph on a short sample first (see utils.preflight).
+    video_encode replaces the default libx265 encode for every output (e.g. the proxy preview encoder).
+    """
+    video_encode = video_encode or ["-c:v", "libx265"]
+    n = len(variants)
+    sources = "".join(f"[src{i}]" for i in range(n))
+    parts = [f"[0:v]split={n}{sources}" if n > 1 else "[0:v]null[src0]"]
+    for i, (_, overrides) in enumerate(variants):
+        parts.append(create_linear_filter_complex(apply_variant(effect_items, overrides),
+                                                  source=f"[src{i}]", out_label=f"out{i}", prefix=f"x{i}"))
+    filter_complex = "; ".join(parts)
+    print("Constructed filter_complex:")
+    print(filter_complex)
+    if check_graph:
+        outputs = [arg for i in range(n) for arg in ("-map", f"[out{i}]")]
+        preflight(["-i", input_file], ["-filter_complex", filter_complex] + outputs, "effects:variants")
+
+    cmd = ["ffmpeg", "-y", "-i", input_file, "-filter_complex", filter_complex]
+    for i, (name, _) in enumerate(variants):
+        cmd += ["-map", f"[out{i}]"] + video_encode
+        if keep_audio:
+            cmd += ["-map", "0:a?", "-c:a", "copy"]
+        cmd.append(variant_output_path(output, name))
+    run_command(cmd)
+    for name, _ in variants:
+        print(f"Variant '{name}' saved to {variant_output_path(output, name)}")
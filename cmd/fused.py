@@ -0,0 +1,48 @@
+from typing import List
+
+from cmd.audio_mixing import build_mix_filter
+from cmd.filters.effects_engine import parse_effect_items
+from cmd.filters.linear_engine import create_linear_filter_complex
+from cmd.sync import compute_sync_factors, build_video_sync_filter
+from utils.ffmpeg_utils import run_command
+
+
+def fuse_render(args) -> None:
+    """
+    Render sync -> mix -> effects as one ffmpeg graph: one decode of the source and a single encode,
+    instead of an x265 encode after sync and another after effects.
+
+    Effect times refer to the synced timeline, exactly as when effects runs on the sync output.
+    Effects are compiled with the linear backend because their source is a filter output, not [0:v].
+    """
+    _, cue_end, seg_start, seg_end, time_factor, speed_factor = compute_sync_factors(args)
+
+    # Input 0: silent audio (as in sync), input 1: the video, inputs 2..: mix files.
+    inputs: List[str] = ["-f", "lavfi", "-i", "anullsrc=cl=stereo:r=48000", "-i", args.input]
+    video_out: str = "synced" if args.effect else "outv"
+    parts: List[str] = [
+        build_video_sync_filter(args, "[1:v]", seg_start, seg_end, time_factor, speed_factor, video_out)
+    ]
+    if args.effect:
+        parts.append(create_linear_filter_complex(parse_effect_items(args.effect), source="[synced]",
+                                                  out_label="outv", prefix="fx"))
+
+    cmd_maps: List[str] = ["-map", "[outv]"]
+    if not args.no_audio:
+        # The sync output's silent track ends with the video at cue_end.
+        parts.append(f"[0:a]atrim=end={cue_end}[silence]")
+        mix_inputs, mix_parts = build_mix_filter(args.mix, "[silence]", 2)
+        inputs += mix_inputs
+        parts += mix_parts
+        cmd_maps += ["-map", "[outa]"]
+
+    filter_complex: str = "; ".join(parts)
+    print("Constructed filter_complex:")
+    print(filter_complex)
+
+    cmd: List[str] = ["ffmpeg", "-y"] + inputs + ["-filter_complex", filter_complex] + cmd_maps + ["-c:v", "libx265"]
+    if not args.no_audio:
+        cmd += ["-c:a", "aac"]
+    cmd.append(args.output)
+    run_command(cmd)
+    print(f"Fused sync/mix/effects render saved to {args.output}")
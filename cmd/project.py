@@ -0,0 +1,127 @@
+import argparse
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait, Future
+from typing import Any, Dict, List, Optional, Set
+
+from cmd import cli
+from utils.cache import content_hash, hash_key, load_json, save_json
+from utils.ffmpeg_utils import FFmpegError
+
+
+def step_argv(step: Dict[str, Any]) -> List[str]:
+    """
+    Turn a project step into the CLI argv of its sub-command, e.g.
+    {"command": "mix", "input": "a.mp4", "output": "b.mp4", "options": {"mix": [[15, "song.mp3"]]}}
+    becomes ["mix", "a.mp4", "b.mp4", "--mix", "15", "song.mp3"].
+    """
+    argv: List[str] = ["--no-audio"] if step.get("no_audio") else []
+    argv += [step["command"], str(step["input"]), str(step["output"])]
+    for key, value in step.get("options", {}).items():
+        flag: str = f"--{key.replace('_', '-')}"
+        if value is True:
+            argv.append(flag)
+        elif value is False or value is None:
+            continue
+        elif isinstance(value, list):
+            for entry in value:
+                argv.append(flag)
+                argv += [str(v) for v in entry] if isinstance(entry, list) else [str(entry)]
+        else:
+            argv += [flag, str(value)]
+    return argv
+
+
+# Parsed argument fields that name files a command reads; --mix items are (start, file) pairs.
+INPUT_FIELDS = ("input", "orig", "audio", "cue_sheet")
+
+
+def step_inputs(step_args: argparse.Namespace) -> List[str]:
+    """Absolute paths of the files a parsed sub-command reads, in argument order."""
+    inputs: List[str] = [os.path.abspath(getattr(step_args, name)) for name in INPUT_FIELDS
+                         if getattr(step_args, name, None)]
+    inputs += [os.path.abspath(item[1]) for item in getattr(step_args, "mix", None) or []]
+    return list(dict.fromkeys(inputs))
+
+
+def load_project(project_file: str, parser: argparse.ArgumentParser) -> List[Dict[str, Any]]:
+    """
+    Load a project file and resolve each step's argv, inputs and upstream dependencies.
+    Every step is parsed up front, so a bad step fails before anything runs.
+    """
+    with open(project_file, "r", encoding="utf-8") as f:
+        project: Dict[str, Any] = json.load(f)
+    steps: List[Dict[str, Any]] = project.get("steps", [])
+    produced: Dict[str, str] = {}
+    for idx, step in enumerate(steps):
+        step.setdefault("name", f"step{idx + 1}")
+        produced[os.path.abspath(step["output"])] = step["name"]
+    for step in steps:
+        step["argv"] = step_argv(step)
+        step["args"] = parser.parse_args(step["argv"])
+        step["inputs"] = step_inputs(step["args"])
+        step["deps"] = {produced[p] for p in step["inputs"] if p in produced and produced[p] != step["name"]}
+    return steps
+
+
+def _step_key(step: Dict[str, Any]) -> str:
+    return hash_key(step["argv"], [(p, content_hash(p)) for p in step["inputs"]])
+
+
+def _is_up_to_date(step: Dict[str, Any], state: Dict[str, Any]) -> bool:
+    record: Optional[Dict[str, str]] = state.get(step["name"])
+    if record is None or not os.path.exists(step["output"]):
+        return False
+    return record.get("key") == _step_key(step) and record.get("output") == content_hash(step["output"])
+
+
+def run_project(args) -> None:
+    """
+    Execute a JSON project as a DAG of the existing sub-commands.
+    A step is skipped when its argv, the contents of its inputs and its output are unchanged
+    since the last successful run; independent steps run concurrently.
+    """
+    steps: List[Dict[str, Any]] = load_project(args.project, cli.build_parser())
+    by_name: Dict[str, Dict[str, Any]] = {step["name"]: step for step in steps}
+    state_key: str = hash_key(os.path.abspath(args.project))
+    state: Dict[str, Any] = load_json("project", state_key) or {}
+    jobs: int = args.jobs if args.jobs is not None else os.cpu_count() or 1
+    # Steps finish on worker threads; each one updates the shared state and rewrites the state file.
+    state_lock = threading.Lock()
+
+    def execute(step: Dict[str, Any]) -> bool:
+        if not args.force and _is_up_to_date(step, state):
+            print(f"[{step['name']}] up to date, skipping")
+            return False
+        print(f"[{step['name']}] running: {' '.join(step['argv'])}")
+        step["args"].func(step["args"])
+        record: Dict[str, str] = {"key": _step_key(step), "output": content_hash(step["output"])}
+        with state_lock:
+            state[step["name"]] = record
+            save_json("project", state_key, dict(state))
+        return True
+
+    done: Set[str] = set()
+    running: Dict[Future, str] = {}
+    pending: List[str] = [step["name"] for step in steps]
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for name in [n for n in pending if by_name[n]["deps"] <= done]:
+                pending.remove(name)
+                running[pool.submit(execute, by_name[name])] = name
+            if not running:
+                print(f"Unresolvable dependencies between steps: {', '.join(pending)}")
+                sys.exit(1)
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    future.result()
+                except (SystemExit, FFmpegError):
+                    print(f"[{name}] failed; stopping project.")
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    sys.exit(1)
+                done.add(name)
+    print(f"Project {args.project} complete.")
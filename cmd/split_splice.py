@@ -1,37 +1,122 @@
 import os
 import sys
+from typing import List, Tuple
 
+from utils.executor import run_parallel
 from utils.ffmpeg_utils import run_command
 from utils.metadata import get_video_metadata
+from utils.smart_cut import smart_cut
 
 
-def split_video(args) -> None:
-    """Extract multiple video segments from an input video."""
-    if args.segment is None:
-        print("No segments provided; nothing to split.")
-        sys.exit(1)
-    if not os.path.exists(args.output):
-        os.makedirs(args.output)
-    for idx, seg in enumerate(args.segment, start=1):
+def parse_segments(segments: List[List[str]]) -> List[Tuple[int, float, float]]:
+    """Validate --segment pairs, returning (index, start, end) for every usable segment."""
+    parsed: List[Tuple[int, float, float]] = []
+    for idx, seg in enumerate(segments, start=1):
         try:
             start_time: float = float(seg[0])
             end_time: float = float(seg[1])
         except ValueError:
             print(f"Segment {idx} times must be numeric.")
             sys.exit(1)
-        duration: float = end_time - start_time
-        if duration <= 0:
+        if end_time - start_time <= 0:
             print(f"Segment {idx}: End time must be greater than start time.")
             continue
+        parsed.append((idx, start_time, end_time))
+    return parsed
+
+
+def _split_single_pass(input_file: str, output_dir: str, segments: List[Tuple[int, float, float]]) -> None:
+    """
+    Write every segment from one ffmpeg process with one output per segment.
+    The input is seeked once to the earliest start and read up to the latest end,
+    so the source is demuxed a single time regardless of the number of cuts.
+    """
+    first_start: float = min(start for _, start, _ in segments)
+    last_end: float = max(end for _, _, end in segments)
+    cmd: List[str] = [
+        "ffmpeg", "-y",
+        "-ss", str(first_start),
+        "-to", str(last_end),
+        "-i", input_file
+    ]
+    for idx, start_time, end_time in segments:
+        output_file: str = os.path.join(output_dir, f"segment_{idx}.mp4")
+        cmd += [
+            "-ss", str(start_time - first_start),
+            "-t", str(end_time - start_time),
+            "-map", "0:v", "-map", "0:a?",
+            "-c", "copy", output_file
+        ]
+    run_command(cmd)
+    for idx, start_time, end_time in segments:
+        print(f"Extracted segment {idx}: {start_time}s to {end_time}s -> "
+              f"{os.path.join(output_dir, f'segment_{idx}.mp4')}")
+
+
+def _reencode_segment_cmd(input_file: str, output_dir: str, idx: int,
+                          start_time: float, end_time: float) -> List[str]:
+    """Re-encode one segment with input-side seeking for a frame-accurate cut."""
+    output_file: str = os.path.join(output_dir, f"segment_{idx}.mp4")
+    return [
+        "ffmpeg", "-y",
+        "-ss", str(start_time),
+        "-i", input_file,
+        "-t", str(end_time - start_time),
+        "-c:v", "libx265",
+        "-c:a", "aac",
+        output_file
+    ]
+
+
+def split_video(args) -> None:
+    """Extract multiple video segments from an input video."""
+    if args.segment is None:
+        print("No segments provided; nothing to split.")
+        sys.exit(1)
+    if not os.path.exists(args.output):
+        os.makedirs(args.output)
+    segments: List[Tuple[int, float, float]] = parse_segments(args.segment)
+    if not segments:
+        return
+
+    stages: List[str] = [f"split:segment_{idx}" for idx, _, _ in segments]
+    if args.reencode:
+        # Split the core budget across --jobs concurrent encodes.
+        jobs: int = args.jobs if args.jobs is not None else 1
+        cores_per_job: int = max(1, (os.cpu_count() or 1) // jobs)
+        run_parallel([_reencode_segment_cmd(args.input, args.output, idx, start, end)
+                      for idx, start, end in segments],
+                     cores_per_job=cores_per_job, core_budget=cores_per_job * jobs, stages=stages)
+        for idx, start_time, end_time in segments:
+            print(f"Extracted segment {idx}: {start_time}s to {end_time}s -> "
+                  f"{os.path.join(args.output, f'segment_{idx}.mp4')}")
+        return
+
+    if args.smart_cut:
+        for idx, start_time, end_time in segments:
+            output_file: str = os.path.join(args.output, f"segment_{idx}.mp4")
+            smart_cut(args.input, start_time, end_time, output_file)
+            print(f"Extracted segment {idx}: {start_time}s to {end_time}s -> {output_file}")
+        return
+
+    if args.single_pass:
+        _split_single_pass(args.input, args.output, segments)
+        return
+
+    # Stream-copy cuts are I/O bound and independent, so they run concurrently under the core budget.
+    cmds: List[List[str]] = []
+    for idx, start_time, end_time in segments:
         output_file: str = os.path.join(args.output, f"segment_{idx}.mp4")
-        cmd = [
+        cmds.append([
             "ffmpeg", "-y", "-i", args.input,
             "-ss", str(start_time),
-            "-t", str(duration),
+            "-t", str(end_time - start_time),
             "-c", "copy", output_file
-        ]
-        run_command(cmd)
-        print(f"Extracted segment {idx}: {start_time}s to {end_time}s -> {output_file}")
+        ])
+    run_parallel(cmds, stages=stages)
+    for idx, start_time, end_time in segments:
+        print(f"Extracted segment {idx}: {start_time}s to {end_time}s -> "
+              f"{os.path.join(args.output, f'segment_{idx}.mp4')}")
 
 
 def adjust_segment(args) -> None:
@@ -58,6 +143,10 @@ def adjust_segment(args) -> None:
     if new_end <= new_start:
         print("Error: new end time must be greater than new start time.")
         sys.exit(1)
+    if args.smart_cut:
+        smart_cut(args.orig, new_start, new_end, args.output)
+        print(f"Adjusted segment extracted from {new_start}s to {new_end}s -> {args.output}")
+        return
     new_duration: float = new_end - new_start
     cmd = [
         "ffmpeg", "-y", "-i", args.orig,
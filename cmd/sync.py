@@ -1,20 +1,27 @@
 import sys
+from typing import Optional, Tuple
 
+from constants import DEFAULT_FALLBACK_FPS, DEFAULT_PROXY_ENCODE
+from utils.metadata import probe
+from utils.onsets import resolve_cue
+from utils.preflight import preflight
+from utils.proxy import build_proxy
+from utils.time_remap import build_remap_table, remap_expression
 
-def sync_video(args) -> None:
-    """
-    Synchronize video by stretching a portion until a musical cue and then splicing in an accelerated segment.
 
-    The output video (args.output) will have a silent audio track injected,
-    ensuring the final file has both video and audio.
+def compute_sync_factors(args) -> Tuple[float, float, float, float, float, float]:
+    """
+    Validate the sync cue/segment arguments and compute the stretch and speed factors.
+    Returns (audio_cue, cue_end, seg_start, seg_end, time_factor, speed_factor).
     """
+    # Cue times may be beat/onset references resolved against --audio.
+    audio_cue: float = resolve_cue(args.audio_cue, args.audio)
+    cue_end: float = resolve_cue(args.cue_end, args.audio)
     try:
-        audio_cue: float = float(args.audio_cue)
-        cue_end: float = float(args.cue_end)
         seg_start: float = float(args.segment_start)
         seg_end: float = float(args.segment_end)
     except ValueError:
-        print("audio-cue, cue-end, segment-start, and segment-end must be numeric.")
+        print("segment-start and segment-end must be numeric.")
         sys.exit(1)
 
     if seg_start <= 0 or seg_end <= seg_start:
@@ -33,19 +40,74 @@ def sync_video(args) -> None:
     speed_factor: float = splice_original_duration / desired_splice_duration
     print(
         f"Calculated speed factor: {speed_factor:.2f} (to compress {splice_original_duration}s to {desired_splice_duration}s)")
+    return audio_cue, cue_end, seg_start, seg_end, time_factor, speed_factor
+
 
-    # Build filter_complex without any glitch effect.
-    # - Segment 1: from 0 to seg_start, stretched by multiplying PTS.
-    # - Segment 2: from seg_start to seg_end, sped up by dividing the PTS.
-    # Then the two segments are concatenated.
-    filter_complex: str = (
-        f"[1:v]trim=start=0:end={seg_start},setpts=PTS*{time_factor}[seg1]; "
-        f"[1:v]trim=start={seg_start}:end={seg_end},setpts=(PTS-STARTPTS)/{speed_factor}[seg2]; "
-        f"[seg1][seg2]concat=n=2:v=1:a=0[outv]"
+def build_sync_filter(video_label: str, seg_start: float, seg_end: float, time_factor: float,
+                      speed_factor: float, out_label: str = "outv") -> str:
+    """
+    Build the sync filter graph without any glitch effect.
+    - Segment 1: from 0 to seg_start, stretched by multiplying PTS.
+    - Segment 2: from seg_start to seg_end, sped up by dividing the PTS.
+    Then the two segments are concatenated.
+    """
+    return (
+        f"{video_label}trim=start=0:end={seg_start},setpts=PTS*{time_factor}[seg1]; "
+        f"{video_label}trim=start={seg_start}:end={seg_end},setpts=(PTS-STARTPTS)/{speed_factor}[seg2]; "
+        f"[seg1][seg2]concat=n=2:v=1:a=0[{out_label}]"
+    )
+
+
+def build_ramp_filter(video_label: str, seg_start: float, seg_end: float, time_factor: float, speed_factor: float,
+                      fps: str, curve: str = "exp", ramp_seconds: Optional[float] = None,
+                      out_label: str = "outv") -> str:
+    """
+    Build the sync filter graph with a speed ramp instead of two constant-rate segments.
+    The source->output mapping is computed once and applied as a single setpts remap on one trim,
+    then fps re-times the result so frames the ramp skips are dropped before the encoder.
+    """
+    audio_cue: float = seg_start * time_factor
+    cue_end: float = audio_cue + (seg_end - seg_start) / speed_factor
+    table = build_remap_table(seg_start, seg_end, audio_cue, cue_end, curve, ramp_seconds)
+    return (
+        f"{video_label}trim=start=0:end={seg_end},"
+        f"setpts='{remap_expression(table)}',fps={fps}[{out_label}]"
     )
+
+
+def build_video_sync_filter(args, video_label: str, seg_start: float, seg_end: float, time_factor: float,
+                            speed_factor: float, out_label: str = "outv") -> str:
+    """Pick the ramped or the constant-rate sync graph depending on --ramp."""
+    if not getattr(args, "ramp", None):
+        return build_sync_filter(video_label, seg_start, seg_end, time_factor, speed_factor, out_label)
+    video = probe(args.input).video
+    fps: str = DEFAULT_FALLBACK_FPS if video is None else "{}/{}".format(*video.fps)
+    return build_ramp_filter(video_label, seg_start, seg_end, time_factor, speed_factor, fps,
+                             args.ramp, args.ramp_duration, out_label)
+
+
+def sync_video(args) -> None:
+    """
+    Synchronize video by stretching a portion until a musical cue and then splicing in an accelerated segment.
+
+    The output video (args.output) will have a silent audio track injected,
+    ensuring the final file has both video and audio.
+    """
+    _, _, seg_start, seg_end, time_factor, speed_factor = compute_sync_factors(args)
+    video_encode = ["-c:v", "libx265"]
+    if args.proxy:
+        # Sync parameters are all times, so the proxy needs no rescaling.
+        args.input, _ = build_proxy(args.input)
+        video_encode = DEFAULT_PROXY_ENCODE
+
+    filter_complex: str = build_video_sync_filter(args, "[1:v]", seg_start, seg_end, time_factor, speed_factor)
     print("Constructed filter_complex:")
     print(filter_complex)
 
+    sync_inputs = ["-f", "lavfi", "-i", "anullsrc=cl=stereo:r=48000", "-i", args.input]
+    if not args.no_preflight:
+        preflight(sync_inputs, ["-filter_complex", filter_complex, "-map", "[outv]", "-map", "0:a"], "sync")
+
     # Build the command using two inputs:
     # - Input 0: a silent audio stream generated by anullsrc.
     # - Input 1: the actual video file.
@@ -58,7 +120,7 @@ def sync_video(args) -> None:
         "-map", "[outv]",
         "-map", "0:a",
         "-shortest",
-        "-c:v", "libx265",
+    ] + video_encode + [
         "-c:a", "aac",
         args.output
     ]
@@ -0,0 +1,127 @@
+import bisect
+import math
+import os
+import sys
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+from cmd.filters.effects_engine import parse_effect_items
+from cmd.split_splice import parse_segments
+from constants import DEFAULT_THUMB_WIDTH, DEFAULT_THUMB_COLUMNS, DEFAULT_THUMB_COUNT, DEFAULT_THUMB_CACHE_MB
+from utils.cache import cache_dir, cached_file, evict_lru, file_identity, hash_key
+from utils.executor import run_parallel
+from utils.ffmpeg_utils import run_command
+from utils.metadata import get_keyframe_times, probe, MediaInfo
+
+
+def collect_timestamps(duration: float, fps: float, effect_items, segments: List[Tuple[int, float, float]],
+                       interval: Optional[float], keyframes: List[float]) -> Dict[float, bool]:
+    """
+    Map each timestamp to whether it must be frame-exact. Effect boundaries and segment edges are
+    exact (the first and last frame inside the range); interval samples are snapped to the keyframe
+    at or before them, so samples sharing a GOP collapse into one thumbnail.
+    """
+    last_frame: float = 1.0 / fps
+    stamps: Dict[float, bool] = {}
+    for start, end in [(item[0], item[1]) for item in effect_items] + [(s[1], s[2]) for s in segments]:
+        for t in (start, end - last_frame):
+            stamps[round(t, 3)] = True
+    if interval is not None and interval > 0:
+        for n in range(int(duration / interval) + 1):
+            idx: int = bisect.bisect_right(keyframes, n * interval) - 1
+            # Floor to the millisecond so the seek below never lands just past the keyframe.
+            t = math.floor(keyframes[idx] * 1000) / 1000 if idx >= 0 else round(n * interval, 3)
+            stamps.setdefault(t, False)
+    return {t: exact for t, exact in stamps.items() if 0 <= t < duration}
+
+
+def _thumb_cmd(input_file: str, t: float, exact: bool, width: int, output: str) -> List[str]:
+    # Input seeking either way. Non-exact stamps sit on a keyframe, so keyframe-only decoding
+    # returns it without decoding the rest of the GOP.
+    fast: List[str] = [] if exact else ["-skip_frame", "nokey"]
+    return (["ffmpeg", "-y", "-v", "error"] + fast + ["-ss", f"{t:.3f}", "-i", input_file,
+            "-frames:v", "1", "-vf", f"scale={width}:-2", "-q:v", "3", output])
+
+
+def extract_thumbs(input_file: str, stamps: Dict[float, bool], width: int, jobs: int) -> List[Tuple[float, str]]:
+    """Extract (or reuse) one JPEG per timestamp, cached per source identity, time, exactness and width."""
+    identity: str = file_identity(input_file)
+    directory: str = cache_dir("thumbs")
+    results: List[Tuple[float, str]] = []
+    missing: List[Tuple[str, str]] = []
+    cmds: List[List[str]] = []
+    for t in sorted(stamps):
+        key: str = hash_key(identity, t, stamps[t], width)
+        hit: Optional[str] = cached_file("thumbs", key, ".jpg")
+        path: str = hit if hit is not None else os.path.join(directory, f"{key}.jpg")
+        results.append((t, path))
+        if hit is None:
+            # Write under a unique name and move into place, so readers never see a partial image.
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".jpg")
+            os.close(fd)
+            missing.append((tmp_path, path))
+            cmds.append(_thumb_cmd(input_file, t, stamps[t], width, tmp_path))
+    print(f"Thumbnails: {len(results) - len(cmds)} cached, {len(cmds)} to extract")
+    try:
+        if cmds:
+            run_parallel(cmds, core_budget=jobs, stages=[f"thumbs:{os.path.basename(p)}" for _, p in missing])
+        for tmp_path, path in missing:
+            if os.path.getsize(tmp_path) == 0:
+                print(f"Error: no frame decoded for {path}; is the timestamp past the last frame?")
+                sys.exit(1)
+            os.replace(tmp_path, path)
+    finally:
+        for tmp_path, _ in missing:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return results
+
+
+def build_contact_sheet(thumbs: List[Tuple[float, str]], columns: int, output: str) -> None:
+    """Tile the thumbnails, in time order, into a single image."""
+    rows: int = math.ceil(len(thumbs) / columns)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        list_file: str = os.path.join(tmp_dir, "thumbs.txt")
+        with open(list_file, "w", encoding="utf-8") as f:
+            for _, path in thumbs:
+                f.write(f"file '{path}'\n")
+        cmd: List[str] = [
+            "ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", list_file,
+            "-vf", f"tile={columns}x{rows}:padding=4:margin=4", "-frames:v", "1", "-q:v", "3", output
+        ]
+        run_command(cmd, stage="thumbs:sheet")
+
+
+def make_thumbs(args) -> None:
+    """
+    Build a contact sheet of frames at effect boundaries, segment edges and fixed intervals.
+    Frames are cached per timestamp, so re-checking an edit only extracts frames that changed;
+    the cache is kept to DEFAULT_THUMB_CACHE_MB, least recently used first.
+    """
+    info: MediaInfo = probe(args.input)
+    if info.duration is None or info.video is None:
+        print(f"Error: {args.input} has no video stream or duration.")
+        sys.exit(1)
+    fps_num, fps_den = info.video.fps
+    effect_items = parse_effect_items(args.effect) if args.effect else []
+    segments: List[Tuple[int, float, float]] = parse_segments(args.segment) if args.segment else []
+    interval: Optional[float] = args.interval
+    if interval is None and not effect_items and not segments:
+        interval = info.duration / DEFAULT_THUMB_COUNT
+    stamps: Dict[float, bool] = collect_timestamps(info.duration, fps_num / fps_den, effect_items, segments,
+                                                   interval, get_keyframe_times(args.input))
+    if not stamps:
+        print("No timestamps inside the video to sample.")
+        sys.exit(1)
+
+    width: int = args.width if args.width is not None else DEFAULT_THUMB_WIDTH
+    columns: int = args.columns if args.columns is not None else DEFAULT_THUMB_COLUMNS
+    jobs: int = args.jobs if args.jobs is not None else os.cpu_count() or 1
+    thumbs: List[Tuple[float, str]] = extract_thumbs(args.input, stamps, width, jobs)
+    build_contact_sheet(thumbs, columns, args.output)
+    # Only after the sheet is built: every thumbnail it uses was just touched and is evicted last.
+    evict_lru("thumbs", DEFAULT_THUMB_CACHE_MB * 1024 * 1024)
+    for idx, (t, _) in enumerate(thumbs):
+        print(f"  tile {idx + 1:>3} (row {idx // columns + 1}, col {idx % columns + 1}): "
+              f"{t:.3f}s{'' if stamps[t] else ' (keyframe)'}")
+    print(f"Contact sheet saved to {args.output}")
@@ -12,6 +12,18 @@ DEFAULT_AUDIO_BITRATE = 64000
 DEFAULT_MIN_VIDEO_KBPS = 100
 DEFAULT_OVERHEAD = 0.02
 DEFAULT_FALLBACK_FPS = "30"
+DEFAULT_LOUDNORM = {"I": -16, "TP": -1.5, "LRA": 11}
+DEFAULT_CHUNK_SECONDS = 10.0
+# Cores per parallel --chunked x265 encode; also sets the default number of parallel chunks.
+DEFAULT_CHUNK_CORES = 4
+DEFAULT_BUS_SIZE = 32
+DEFAULT_MAX_DECODERS = 128
+DEFAULT_SAMPLE_COUNT = 5
+DEFAULT_SAMPLE_SECONDS = 4.0
+DEFAULT_SAMPLE_CRFS = [22, 28, 34]
+DEFAULT_SIZE_TOLERANCE = 0.1
+DEFAULT_PREFLIGHT_SECONDS = 0.5
+DEFAULT_PREFLIGHT_TIMEOUT = 60
 
 DEFAULT_FADE = {"type": "in", "duration": 1.0}
 DEFAULT_SCALE = {"w": "iw", "h": "ih"}
@@ -42,3 +54,24 @@ DEFAULT_DRAWTEXT = {
     "fontsize": 24,
     "fontcolor": "white"
 }
+
+DEFAULT_CACHE_DIR = "~/.cache/ffmpeg_toy"
+DEFAULT_RENDER_CACHE_MB = 2048
+DEFAULT_PCM_CACHE_MB = 4096
+DEFAULT_X265_STATS_CACHE_MB = 2048
+
+DEFAULT_DAEMON_HOST = "127.0.0.1"
+DEFAULT_DAEMON_PORT = 8765
+DEFAULT_DAEMON_WORKERS = 2
+# Finished jobs the daemon keeps for status queries; older ones are dropped first.
+DEFAULT_DAEMON_KEEP_FINISHED = 1000
+DEFAULT_PROBE_MEMO_SIZE = 1024
+
+DEFAULT_PROXY_HEIGHT = 360
+DEFAULT_PROXY_CACHE_MB = 8192
+DEFAULT_PROXY_ENCODE = ["-c:v", "libx264", "-preset", "ultrafast", "-crf", "28"]
+
+DEFAULT_THUMB_WIDTH = 320
+DEFAULT_THUMB_COLUMNS = 6
+DEFAULT_THUMB_COUNT = 24
+DEFAULT_THUMB_CACHE_MB = 512
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, List, Optional, Tuple
+
+from constants import DEFAULT_CACHE_DIR
+
+
+def cache_root() -> str:
+    """Return the cache root, honouring the FFMPEG_TOY_CACHE environment variable."""
+    root: str = os.environ.get("FFMPEG_TOY_CACHE", DEFAULT_CACHE_DIR)
+    return os.path.abspath(os.path.expanduser(root))
+
+
+def cache_dir(namespace: str) -> str:
+    """Return (and create) the cache directory for a namespace such as 'probe'."""
+    path: str = os.path.join(cache_root(), namespace)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def file_identity(input_file: str) -> str:
+    """Identify a file by absolute path, size and mtime without reading its contents."""
+    st = os.stat(input_file)
+    return f"{os.path.abspath(input_file)}|{st.st_size}|{st.st_mtime_ns}"
+
+
+def hash_key(*parts: Any) -> str:
+    """Hash arbitrary JSON-serialisable parts into a cache key."""
+    blob: str = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def content_hash(path: str) -> str:
+    """
+    SHA-256 of a file's contents (or of a directory's files), memoised by path/size/mtime
+    so unchanged media is only read once.
+    """
+    if os.path.isdir(path):
+        names: List[str] = sorted(os.listdir(path))
+        return hash_key([(name, content_hash(os.path.join(path, name))) for name in names])
+    key: str = hash_key(file_identity(path))
+    cached: Optional[str] = load_json("hashes", key)
+    if cached is not None:
+        return cached
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    value: str = digest.hexdigest()
+    save_json("hashes", key, value)
+    return value
+
+
+def load_json(namespace: str, key: str) -> Optional[Any]:
+    """Load a cached JSON document, or None if missing or unreadable."""
+    path: str = os.path.join(cache_dir(namespace), f"{key}.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_json(namespace: str, key: str, data: Any) -> None:
+    """Atomically write a JSON document so concurrent jobs never see a partial file."""
+    directory: str = cache_dir(namespace)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, os.path.join(directory, f"{key}.json"))
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def cached_file(namespace: str, key: str, suffix: str) -> Optional[str]:
+    """Return the path of a cached artifact and mark it as recently used, or None on a miss."""
+    path: str = os.path.join(cache_dir(namespace), f"{key}{suffix}")
+    if not os.path.exists(path):
+        return None
+    os.utime(path)
+    return path
+
+
+def evict_lru(namespace: str, max_bytes: int) -> None:
+    """Delete the least recently used artifacts in a namespace until it fits in max_bytes."""
+    directory: str = cache_dir(namespace)
+    entries: List[Tuple[float, int, str]] = []
+    for name in os.listdir(directory):
+        path: str = os.path.join(directory, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    total: int = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
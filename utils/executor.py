@@ -0,0 +1,119 @@
+import asyncio
+import contextlib
+import os
+import signal
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Dict, List, Optional
+
+from utils.ffmpeg_utils import FFmpegError, collect_command, start_command
+
+
+def with_thread_budget(cmd: List[str], threads: int) -> List[str]:
+    """
+    Pin an ffmpeg command to a thread budget: -threads before the output file and,
+    for libx265, pools=N in -x265-params so x265 does not spawn one worker per core.
+    """
+    cmd = list(cmd)
+    if os.path.basename(cmd[0]) != "ffmpeg":
+        return cmd
+    if "libx265" in cmd:
+        if "-x265-params" in cmd:
+            i = cmd.index("-x265-params") + 1
+            cmd[i] = f"{cmd[i]}:pools={threads}"
+        else:
+            cmd[-1:-1] = ["-x265-params", f"pools={threads}"]
+    cmd[-1:-1] = ["-threads", str(threads)]
+    return cmd
+
+
+class JobExecutor:
+    """
+    Runs ffmpeg processes concurrently under a global core budget.
+    Each job reserves a number of cores before it starts and is given matching -threads/pools values,
+    so parallel jobs never oversubscribe the machine. Every job records the same metrics as
+    run_command. Failures raise FFmpegError; timeouts and cancellation kill the child process.
+    """
+
+    def __init__(self, core_budget: Optional[int] = None):
+        self.core_budget: int = core_budget if core_budget is not None else os.cpu_count() or 1
+        self._available: int = self.core_budget
+        self._cond: Optional[asyncio.Condition] = None
+        # At most core_budget jobs run at once, each holding one collector thread.
+        self._threads = ThreadPoolExecutor(max_workers=self.core_budget)
+
+    def _condition(self) -> asyncio.Condition:
+        # Created lazily so it binds to the running event loop.
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def run(self, cmd: List[str], cores: int = 1, stage: Optional[str] = None,
+                  timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Run cmd once cores are free; a job still running after timeout seconds is killed (FFmpegError)."""
+        cores = max(1, min(cores, self.core_budget))
+        stage = stage if stage is not None else os.path.basename(str(cmd[-1]))
+        cond = self._condition()
+        async with cond:
+            await cond.wait_for(lambda: self._available >= cores)
+            self._available -= cores
+        try:
+            return await self._run_process(with_thread_budget(cmd, cores), stage, timeout)
+        finally:
+            async with cond:
+                self._available += cores
+                cond.notify_all()
+
+    async def _run_process(self, cmd: List[str], stage: str, timeout: Optional[float]) -> Dict[str, Any]:
+        # Same progress parsing and wait4 rusage as run_command; the blocking collector runs on a
+        # worker thread so the event loop keeps scheduling other jobs.
+        proc, cmd, stage = start_command(cmd, stage, stdin=subprocess.DEVNULL)
+        loop = asyncio.get_running_loop()
+        collector = loop.run_in_executor(self._threads, collect_command, proc, cmd, stage)
+        try:
+            return await asyncio.wait_for(asyncio.shield(collector), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # Signal by pid rather than proc.kill(): Popen would poll and could reap the child
+            # before the collector's wait4. The collector reaps it and records its metrics.
+            # Once the collector is done the pid is reaped (and may be reused), so leave it alone.
+            if not collector.done():
+                with contextlib.suppress(ProcessLookupError):
+                    os.kill(proc.pid, signal.SIGKILL)
+            await asyncio.gather(collector, return_exceptions=True)
+            if isinstance(e, asyncio.TimeoutError):
+                print(f"[{stage}] timed out after {timeout:g}s")
+                raise FFmpegError(f"{stage}:timeout", proc.returncode, cmd) from None
+            raise
+
+    def shutdown(self) -> None:
+        self._threads.shutdown(wait=True)
+
+    async def gather(self, jobs: List[Awaitable[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Run jobs concurrently; the first failure cancels (and kills) the rest and is re-raised."""
+        tasks = [asyncio.ensure_future(job) for job in jobs]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+
+def run_parallel(cmds: List[List[str]], cores_per_job: int = 1, core_budget: Optional[int] = None,
+                 stages: Optional[List[str]] = None, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Synchronous entry point: run commands concurrently under a core budget.
+    timeout bounds each job's running time (not time spent waiting for cores).
+    """
+    executor = JobExecutor(core_budget)
+    names: List[Optional[str]] = list(stages) if stages is not None else [None] * len(cmds)
+
+    async def main() -> List[Dict[str, Any]]:
+        return await executor.gather([executor.run(cmd, cores_per_job, name, timeout)
+                                      for cmd, name in zip(cmds, names)])
+
+    try:
+        return asyncio.run(main())
+    finally:
+        executor.shutdown()
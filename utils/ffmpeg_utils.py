@@ -1,15 +1,160 @@
+import contextlib
+import json
+import os
+import signal
 import subprocess
 import sys
+import threading
+import time
+from typing import IO, Any, Dict, List, Optional, Tuple
 
+_metrics_file: Optional[str] = None
 
-def run_command(cmd: list) -> None:
-    """Run a command via subprocess and exit on error."""
+
+class FFmpegError(Exception):
+    """A command exited non-zero (or was killed); carries the stage and return code."""
+
+    def __init__(self, stage: str, returncode: Optional[int], cmd: List[str]):
+        super().__init__(f"{stage}: command failed with return code {returncode}")
+        self.stage = stage
+        self.returncode = returncode
+        self.cmd = cmd
+
+
+def set_metrics_file(path: Optional[str]) -> None:
+    """Append a JSON metrics record for every command run from now on to path (None disables)."""
+    global _metrics_file
+    _metrics_file = path
+
+
+def record_metrics(metrics: Dict[str, Any]) -> None:
+    """Append one metrics record to the metrics file, if one is configured."""
+    if _metrics_file is not None:
+        with open(_metrics_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(metrics) + "\n")
+
+
+def _expected_duration(cmd: List[str]) -> Optional[float]:
+    """Best-effort output duration for ETA: an explicit -t, else the probed duration of the first input."""
+    try:
+        if "-t" in cmd:
+            return float(cmd[cmd.index("-t") + 1])
+    except (IndexError, ValueError):
+        pass
+    if "-i" in cmd:
+        input_file: str = cmd[cmd.index("-i") + 1]
+        if os.path.isfile(input_file):
+            from utils.metadata import get_video_metadata
+            return get_video_metadata(input_file)[0]
+    return None
+
+
+def _progress_number(progress: Dict[str, str], key: str) -> float:
+    try:
+        return float(progress.get(key, "").rstrip("x"))
+    except ValueError:
+        return 0.0
+
+
+def _report_progress(progress: Dict[str, str], duration: Optional[float], stage: str) -> None:
+    out_time: float = _progress_number(progress, "out_time_us") / 1e6
+    speed: float = _progress_number(progress, "speed")
+    size_mb: float = _progress_number(progress, "total_size") / 1e6
+    line: str = (f"[{stage}] frame={progress.get('frame', '0')} fps={progress.get('fps', '0')} "
+                 f"speed={speed:.2f}x size={size_mb:.1f}MB")
+    if duration and speed > 0:
+        line += f" eta={max(0.0, duration - out_time) / speed:.0f}s"
+    sys.stderr.write("\r" + line)
+    sys.stderr.flush()
+
+
+def start_command(cmd: list, stage: Optional[str] = None, stdin: Optional[int] = None,
+                  stderr: Optional[IO] = None) -> Tuple[subprocess.Popen, List[str], str]:
+    """
+    Start a command for collect_command, returning (process, command as run, stage).
+    ffmpeg commands get -progress on stdout so the collector can report and record progress.
+    stderr, if given, is a file that receives the command's log instead of the terminal.
+    """
+    stage = stage if stage is not None else os.path.basename(str(cmd[-1]))
     print("Running command:")
     print(" ".join(cmd))
-    result = subprocess.run(cmd)
-    if result.returncode != 0:
+    if os.path.basename(cmd[0]) == "ffmpeg":
+        cmd = [cmd[0], "-progress", "pipe:1", "-nostats"] + list(cmd[1:])
+        return subprocess.Popen(cmd, stdout=subprocess.PIPE, stdin=stdin, stderr=stderr, text=True), cmd, stage
+    return subprocess.Popen(cmd, stdin=stdin, stderr=stderr), list(cmd), stage
+
+
+def collect_command(proc: subprocess.Popen, cmd: List[str], stage: str) -> Dict[str, Any]:
+    """
+    Follow a started command to exit: report progress, reap it and return (and optionally log) its
+    wall time, CPU time, peak RSS and final progress. Raises FFmpegError on failure.
+    Blocks, so asynchronous callers run it on a worker thread.
+    """
+    duration: Optional[float] = _expected_duration(cmd) if proc.stdout is not None else None
+    start: float = time.monotonic()
+    progress: Dict[str, str] = {}
+    if proc.stdout is not None:
+        for line in proc.stdout:
+            key, _, value = line.strip().partition("=")
+            progress[key] = value
+            if key == "progress":
+                _report_progress(progress, duration, stage)
+        sys.stderr.write("\n")
+    # wait4 gives the rusage of this child alone, so CPU time and peak RSS are per stage.
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    metrics: Dict[str, Any] = {
+        "stage": stage,
+        "command": cmd[0],
+        "returncode": proc.returncode,
+        "wall_s": round(time.monotonic() - start, 3),
+        "user_s": round(usage.ru_utime, 3),
+        "sys_s": round(usage.ru_stime, 3),
+        "peak_rss_kib": usage.ru_maxrss,
+        "frames": progress.get("frame"),
+        "fps": progress.get("fps"),
+        "speed": progress.get("speed"),
+        "total_size": progress.get("total_size"),
+    }
+    record_metrics(metrics)
+    if proc.returncode != 0:
         print("Command failed!")
-        sys.exit(1)
+        raise FFmpegError(stage, proc.returncode, cmd)
+    return metrics
+
+
+def run_command(cmd: list, stage: Optional[str] = None, stderr: Optional[IO] = None,
+                timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Run a command via subprocess and raise FFmpegError on failure.
+    ffmpeg commands report frames/s, speed, output size and ETA from the -progress stream,
+    and every command returns (and optionally logs) wall time, CPU time and peak RSS.
+    Pass a file as stderr to capture the command's log (e.g. filters that report on stderr).
+    A command still running after timeout seconds is killed; its FFmpegError stage ends in ':timeout'.
+    """
+    proc, cmd, stage = start_command(cmd, stage, stderr=stderr)
+    if timeout is None:
+        return collect_command(proc, cmd, stage)
+    expired = threading.Event()
+
+    def expire() -> None:
+        # Signal by pid, as JobExecutor does, so collect_command's wait4 stays the only reaper;
+        # once it has set returncode the pid is reaped and may be reused.
+        if proc.returncode is None:
+            expired.set()
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(proc.pid, signal.SIGKILL)
+
+    timer = threading.Timer(timeout, expire)
+    timer.start()
+    try:
+        return collect_command(proc, cmd, stage)
+    except FFmpegError:
+        if expired.is_set():
+            raise FFmpegError(f"{stage}:timeout", proc.returncode, cmd) from None
+        raise
+    finally:
+        timer.cancel()
 
 
 def copy_file(input_file: str, output_file: str) -> None:
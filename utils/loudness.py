@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional
+
+from constants import DEFAULT_LOUDNORM
+from utils.cache import content_hash, hash_key, load_json, save_json
+from utils.ffmpeg_utils import run_command
+
+MEASURED_KEYS = ("input_i", "input_lra", "input_tp", "input_thresh", "target_offset")
+
+
+def _targets(targets: Optional[Dict[str, float]]) -> str:
+    t = targets if targets is not None else DEFAULT_LOUDNORM
+    return f"I={t['I']}:TP={t['TP']}:LRA={t['LRA']}"
+
+
+def measure_loudness(inputs: List[str], audio_graph: str, targets: Optional[Dict[str, float]] = None,
+                     sources: Optional[List[Any]] = None) -> Dict[str, str]:
+    """
+    First loudnorm pass over the [outa] output of audio_graph, built from the -i files in inputs.
+    The measurement (I, LRA, TP, threshold, offset) is cached per input content hash, input options
+    and graph, so repeat renders of the same audio only pay for the second pass. When inputs are
+    intermediates rendered for this job, pass sources (whatever they were made from) as the key instead.
+    """
+    if sources is None:
+        sources = [content_hash(arg) if idx > 0 and inputs[idx - 1] == "-i" and os.path.isfile(arg) else arg
+                   for idx, arg in enumerate(inputs)]
+    key: str = hash_key(sources, audio_graph, _targets(targets))
+    cached: Optional[Dict[str, str]] = load_json("loudness", key)
+    if cached is not None:
+        print(f"Loudness: using cached measurement (I={cached['input_i']} LUFS)")
+        return cached
+
+    cmd: List[str] = ["ffmpeg", "-hide_banner"] + inputs + [
+        "-filter_complex", f"{audio_graph}; [outa]loudnorm={_targets(targets)}:print_format=json[meas]",
+        "-map", "[meas]", "-f", "null", "-"
+    ]
+    print("Loudness: measuring (first pass)")
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as log:
+        run_command(cmd, stage="loudness:measure", stderr=log)
+        log.seek(0)
+        stderr: str = log.read()
+    # loudnorm prints its JSON block last on stderr.
+    report: str = stderr[stderr.rindex("{"):stderr.rindex("}") + 1]
+    data: Dict[str, str] = json.loads(report)
+    measurement: Dict[str, str] = {k: data[k] for k in MEASURED_KEYS}
+    save_json("loudness", key, measurement)
+    print(f"Loudness: measured I={measurement['input_i']} LUFS, LRA={measurement['input_lra']}, "
+          f"TP={measurement['input_tp']}")
+    return measurement
+
+
+def loudnorm_filter(measurement: Dict[str, str], targets: Optional[Dict[str, float]] = None) -> str:
+    """Second loudnorm pass using a stored measurement, resampled back from loudnorm's 192 kHz."""
+    return (
+        f"loudnorm={_targets(targets)}:"
+        f"measured_I={measurement['input_i']}:measured_LRA={measurement['input_lra']}:"
+        f"measured_TP={measurement['input_tp']}:measured_thresh={measurement['input_thresh']}:"
+        f"offset={measurement['target_offset']}:linear=true,aresample=48000"
+    )
+
+
+def normalize_audio_filter(input_file: str, duration: Optional[float] = None) -> str:
+    """
+    Measure (or reuse) the loudness of input_file's first audio stream and return the second-pass -af chain.
+    duration limits the measurement to the first seconds, matching an encode of only that span.
+    """
+    graph: str = "[0:a:0]anull[outa]"
+    inputs: List[str] = (["-t", str(duration)] if duration is not None else []) + ["-i", input_file]
+    return loudnorm_filter(measure_loudness(inputs, graph))
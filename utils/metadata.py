@@ -1,6 +1,12 @@
+import functools
+import json
 import os
 import subprocess
-from typing import Tuple, Optional, List
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Tuple, Optional, List
+
+from constants import DEFAULT_PROBE_MEMO_SIZE
+from utils.cache import file_identity, hash_key, load_json, save_json
 
 
 def ffprobe(*args: str) -> str:
@@ -8,34 +14,176 @@ def ffprobe(*args: str) -> str:
     return output.decode().strip()
 
 
-def get_video_metadata(input_file: str) -> Tuple[Optional[float], Optional[int], Optional[int], Tuple[int, int], int]:
-    """Extract video metadata using ffprobe."""
-    duration: Optional[float] = None
+@dataclass
+class StreamInfo:
+    index: int
+    codec_type: str
+    codec_name: Optional[str] = None
+    pix_fmt: Optional[str] = None
     width: Optional[int] = None
     height: Optional[int] = None
-    fps_num: int = 30
-    fps_den: int = 1
-    size_bytes: int = 0
-    try:
-        duration_str: str = ffprobe("-select_streams", "v:0", "-show_entries", "format=duration",
-                                    "-of", "default=noprint_wrappers=1:nokey=1", input_file)
-        duration = float(duration_str)
-        width_str: str = ffprobe("-select_streams", "v:0", "-show_entries", "stream=width",
-                                 "-of", "default=noprint_wrappers=1:nokey=1", input_file)
-        width = int(width_str)
-        height_str: str = ffprobe("-select_streams", "v:0", "-show_entries", "stream=height",
-                                  "-of", "default=noprint_wrappers=1:nokey=1", input_file)
-        height = int(height_str)
-        fps_str: str = ffprobe("-select_streams", "v:0", "-show_entries", "stream=r_frame_rate",
-                               "-of", "default=noprint_wrappers=1:nokey=1", input_file)
-        parts: List[str] = fps_str.split("/")
+    r_frame_rate: Optional[str] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    duration: Optional[float] = None
+    bit_rate: Optional[int] = None
+    profile: Optional[str] = None
+    level: Optional[int] = None
+    color_range: Optional[str] = None
+    color_space: Optional[str] = None
+    color_primaries: Optional[str] = None
+    color_transfer: Optional[str] = None
+    rotation: int = 0
+
+    @property
+    def display_size(self) -> Tuple[Optional[int], Optional[int]]:
+        """(width, height) as shown after autorotation; coded dims swap for quarter turns."""
+        if self.rotation % 180 == 90:
+            return self.height, self.width
+        return self.width, self.height
+
+    @property
+    def fps(self) -> Tuple[int, int]:
+        parts: List[str] = (self.r_frame_rate or "").split("/")
         if len(parts) == 2 and parts[1] != "0":
-            fps_num = int(parts[0])
-            fps_den = int(parts[1])
-        size_bytes = os.path.getsize(input_file)
+            return int(parts[0]), int(parts[1])
+        return 30, 1
+
+
+@dataclass
+class MediaInfo:
+    path: str
+    size_bytes: int
+    duration: Optional[float]
+    format_name: Optional[str]
+    bit_rate: Optional[int]
+    streams: List[StreamInfo] = field(default_factory=list)
+
+    @property
+    def video(self) -> Optional[StreamInfo]:
+        return next((s for s in self.streams if s.codec_type == "video"), None)
+
+    @property
+    def audio(self) -> List[StreamInfo]:
+        return [s for s in self.streams if s.codec_type == "audio"]
+
+
+def _opt(value: Any, cast: Callable[[Any], Any]) -> Any:
+    try:
+        return cast(value) if value not in (None, "", "N/A") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _rotation(stream: Dict[str, Any]) -> int:
+    """Display rotation in degrees, from the display matrix side data or the legacy rotate tag."""
+    for side_data in stream.get("side_data_list", []):
+        if "rotation" in side_data:
+            return int(round(float(side_data["rotation"]))) % 360
+    return (_opt(stream.get("tags", {}).get("rotate"), int) or 0) % 360
+
+
+def _parse_probe(input_file: str, data: Dict[str, Any]) -> MediaInfo:
+    fmt: Dict[str, Any] = data.get("format", {})
+    streams: List[StreamInfo] = []
+    for s in data.get("streams", []):
+        streams.append(StreamInfo(
+            index=int(s.get("index", len(streams))),
+            codec_type=s.get("codec_type", ""),
+            codec_name=s.get("codec_name"),
+            pix_fmt=s.get("pix_fmt"),
+            width=_opt(s.get("width"), int),
+            height=_opt(s.get("height"), int),
+            r_frame_rate=s.get("r_frame_rate"),
+            sample_rate=_opt(s.get("sample_rate"), int),
+            channels=_opt(s.get("channels"), int),
+            duration=_opt(s.get("duration"), float),
+            bit_rate=_opt(s.get("bit_rate"), int),
+            profile=s.get("profile"),
+            level=_opt(s.get("level"), int),
+            color_range=s.get("color_range"),
+            color_space=s.get("color_space"),
+            color_primaries=s.get("color_primaries"),
+            color_transfer=s.get("color_transfer"),
+            rotation=_rotation(s),
+        ))
+    return MediaInfo(
+        path=input_file,
+        size_bytes=_opt(fmt.get("size"), int) or os.path.getsize(input_file),
+        duration=_opt(fmt.get("duration"), float),
+        format_name=fmt.get("format_name"),
+        bit_rate=_opt(fmt.get("bit_rate"), int),
+        streams=streams,
+    )
+
+
+# In-process layer over the disk cache; stays warm across jobs in a long-running daemon,
+# bounded so a daemon that sees many files does not grow without limit.
+@functools.lru_cache(maxsize=DEFAULT_PROBE_MEMO_SIZE)
+def _probe_memo(key: str, input_file: str) -> MediaInfo:
+    data: Optional[Dict[str, Any]] = load_json("probe", key)
+    if data is None:
+        raw: str = ffprobe("-show_format", "-show_streams", "-of", "json", input_file)
+        data = json.loads(raw)
+        save_json("probe", key, data)
+    return _parse_probe(input_file, data)
+
+
+def probe(input_file: str) -> MediaInfo:
+    """
+    Probe a file with a single ffprobe call and return every stream.
+    Results are cached on disk keyed by path, size and mtime so repeat probes spawn no process.
+    """
+    return _probe_memo(hash_key(file_identity(input_file)), input_file)
+
+
+def get_video_metadata(input_file: str) -> Tuple[Optional[float], Optional[int], Optional[int], Tuple[int, int], int]:
+    """Extract video metadata using ffprobe."""
+    try:
+        info: MediaInfo = probe(input_file)
     except Exception:
-        pass
-    return duration, width, height, (fps_num, fps_den), size_bytes
+        return None, None, None, (30, 1), 0
+    video: Optional[StreamInfo] = info.video
+    if video is None:
+        return info.duration, None, None, (30, 1), info.size_bytes
+    return info.duration, video.width, video.height, video.fps, info.size_bytes
+
+
+def get_packet_index(input_file: str) -> Dict[str, List[Any]]:
+    """
+    Build the video packet index from packet metadata alone (no decoding):
+      - keyframes: presentation times of every keyframe.
+      - bytes_per_second: compressed video bytes in each whole second, a cheap complexity measure.
+    The index is cached alongside the probe data under the same path/size/mtime key.
+    """
+    key: str = hash_key(file_identity(input_file))
+    cached: Optional[Dict[str, List[Any]]] = load_json("packets", key)
+    if cached is not None:
+        return cached
+    raw: str = ffprobe("-select_streams", "v:0", "-show_entries", "packet=pts_time,size,flags",
+                       "-of", "csv=p=0", input_file)
+    keyframes: List[float] = []
+    bytes_per_second: List[int] = []
+    for line in raw.splitlines():
+        parts: List[str] = line.split(",")
+        if len(parts) < 3 or parts[0] in ("", "N/A"):
+            continue
+        pts: float = float(parts[0])
+        if "K" in parts[2]:
+            keyframes.append(pts)
+        second: int = max(0, int(pts))
+        if second >= len(bytes_per_second):
+            bytes_per_second.extend([0] * (second + 1 - len(bytes_per_second)))
+        bytes_per_second[second] += _opt(parts[1], int) or 0
+    keyframes.sort()
+    index: Dict[str, List[Any]] = {"keyframes": keyframes, "bytes_per_second": bytes_per_second}
+    save_json("packets", key, index)
+    return index
+
+
+def get_keyframe_times(input_file: str) -> List[float]:
+    """Return the presentation times of every video keyframe from the cached packet index."""
+    return get_packet_index(input_file)["keyframes"]
 
 
 def calculate_bitrate_kbps(target_size_mb: int, duration: float, audio_bitrate_bps: int, overhead: float,
@@ -81,10 +229,6 @@ def build_filter_string(resolution: Optional[str], denoise_strength: Optional[st
 def has_audio_stream(input_file: str) -> bool:
     """Check whether the input file contains an audio stream."""
     try:
-        output = subprocess.check_output(
-            ["ffprobe", "-v", "error", "-select_streams", "a", "-show_entries", "stream=index",
-             "-of", "csv=p=0", input_file]
-        )
-        return bool(output.strip())
-    except subprocess.CalledProcessError:
+        return bool(probe(input_file).audio)
+    except (OSError, ValueError, subprocess.CalledProcessError):
         return False
@@ -0,0 +1,155 @@
+import re
+import sys
+from typing import Any, Dict, List, Optional
+
+from utils import pcm
+from utils.cache import file_identity, hash_key, load_json, save_json
+
+ANALYSIS_SAMPLE_RATE = 22050
+FRAME_SIZE = 2048
+HOP_SIZE = 512
+MIN_BPM = 60.0
+MAX_BPM = 200.0
+# Envelope values are reported at the centre of their analysis frame.
+FRAME_OFFSET = FRAME_SIZE / 2 / ANALYSIS_SAMPLE_RATE
+
+
+def _onset_envelope(mono):
+    """Half-wave rectified log-magnitude spectral flux, one value per hop."""
+    np = pcm.np
+    if len(mono) < FRAME_SIZE:
+        return np.zeros(0, dtype=np.float32)
+    frames = np.lib.stride_tricks.sliding_window_view(mono, FRAME_SIZE)[::HOP_SIZE]
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(FRAME_SIZE).astype(np.float32), axis=1))
+    log_spec = np.log1p(100.0 * spectrum)
+    flux = np.maximum(0.0, np.diff(log_spec, axis=0)).sum(axis=1)
+    flux = np.concatenate([[0.0], flux])
+    peak = flux.max()
+    return (flux / peak if peak > 0 else flux).astype(np.float32)
+
+
+def _pick_onsets(envelope, fps: float) -> List[float]:
+    """Local maxima above a moving-average threshold (plus a median floor), at least 50 ms apart."""
+    np = pcm.np
+    window = max(1, int(0.1 * fps))
+    kernel = np.ones(2 * window + 1, dtype=np.float32) / (2 * window + 1)
+    threshold = np.maximum(np.convolve(envelope, kernel, mode="same"), np.median(envelope)) + 0.1
+    is_peak = np.zeros(len(envelope), dtype=bool)
+    is_peak[1:-1] = (envelope[1:-1] > envelope[:-2]) & (envelope[1:-1] >= envelope[2:])
+    candidates = np.flatnonzero(is_peak & (envelope > threshold))
+    onsets: List[float] = []
+    min_gap = 0.05
+    for idx in candidates:
+        t = float(idx / fps) + FRAME_OFFSET
+        if not onsets or t - onsets[-1] >= min_gap:
+            onsets.append(round(t, 4))
+    return onsets
+
+
+def _beat_grid(envelope, fps: float, duration: float) -> Dict[str, Any]:
+    """Estimate tempo by autocorrelation of the envelope, then choose the grid phase with most onset energy."""
+    np = pcm.np
+    if len(envelope) < 4:
+        return {"bpm": None, "beats": []}
+    env = envelope - envelope.mean()
+    n = len(env)
+    spectrum = np.fft.rfft(env, 2 * n)
+    autocorr = np.fft.irfft(spectrum * np.conj(spectrum))[:n]
+    min_lag = max(1, int(fps * 60.0 / MAX_BPM))
+    max_lag = min(n - 1, int(fps * 60.0 / MIN_BPM))
+    if max_lag <= min_lag:
+        return {"bpm": None, "beats": []}
+    # Weight lags towards 120 BPM (log-Gaussian, one octave wide) to avoid half/double tempo picks.
+    lags = np.arange(min_lag, max_lag + 1)
+    weights = np.exp(-0.5 * np.log2((60.0 * fps / lags) / 120.0) ** 2)
+    scores = autocorr[min_lag:max_lag + 1] * weights
+    best = int(np.argmax(scores))
+    lag = float(lags[best])
+    if 0 < best < len(scores) - 1:
+        # Parabolic interpolation gives a sub-frame period, so the grid does not drift over a whole song.
+        a, b, c = scores[best - 1], scores[best], scores[best + 1]
+        denom = a - 2 * b + c
+        if denom != 0:
+            lag += 0.5 * (a - c) / denom
+    step = int(round(lag))
+    phase = int(np.argmax([envelope[p::step].sum() for p in range(step)]))
+    period = lag / fps
+    beats = [round(float(t) + FRAME_OFFSET, 4) for t in np.arange(phase / fps, duration, period)]
+    return {"bpm": round(60.0 / period, 2), "beats": beats}
+
+
+def analyze_audio(audio_file: str) -> Dict[str, Any]:
+    """
+    Decode once to mono PCM and compute onsets and a beat grid from STFT spectral flux.
+    Results are cached per audio file (path/size/mtime), and the decoded PCM is cached separately.
+    """
+    key: str = hash_key(file_identity(audio_file), ANALYSIS_SAMPLE_RATE, FRAME_SIZE, HOP_SIZE)
+    cached: Optional[Dict[str, Any]] = load_json("onsets", key)
+    if cached is not None:
+        return cached
+    mono = pcm.decode_pcm(audio_file, sample_rate=ANALYSIS_SAMPLE_RATE, channels=1)[:, 0]
+    fps: float = ANALYSIS_SAMPLE_RATE / HOP_SIZE
+    duration: float = len(mono) / ANALYSIS_SAMPLE_RATE
+    envelope = _onset_envelope(pcm.np.asarray(mono, dtype=pcm.np.float32))
+    grid = _beat_grid(envelope, fps, duration)
+    result: Dict[str, Any] = {
+        "duration": duration,
+        "bpm": grid["bpm"],
+        "beats": grid["beats"],
+        "onsets": _pick_onsets(envelope, fps),
+    }
+    save_json("onsets", key, result)
+    return result
+
+
+_BEAT_RE = re.compile(r"^beat\s+(\d+)$")
+_ONSET_RE = re.compile(r"^onset\s+(\d+)$")
+_NEXT_RE = re.compile(r"^next\s+(onset|beat)\s+after\s+([0-9.]+)s?$")
+
+
+def resolve_cue(expr: str, audio_file: Optional[str]) -> float:
+    """
+    Resolve a cue time: a number of seconds, or with an audio file, a reference such as
+    "beat 32", "onset 5" (1-based) or "next onset after 15s" / "next beat after 15".
+    """
+    text: str = str(expr).strip().lower()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    if audio_file is None:
+        print(f"Cue '{expr}' is not numeric; pass --audio to resolve beat/onset references.")
+        sys.exit(1)
+    analysis: Dict[str, Any] = analyze_audio(audio_file)
+    match = _BEAT_RE.match(text) or _ONSET_RE.match(text)
+    if match:
+        times: List[float] = analysis["beats"] if text.startswith("beat") else analysis["onsets"]
+        n: int = int(match.group(1))
+        if not 1 <= n <= len(times):
+            print(f"Cue '{expr}' is out of range ({len(times)} available).")
+            sys.exit(1)
+        return times[n - 1]
+    match = _NEXT_RE.match(text)
+    if match:
+        times = analysis["beats"] if match.group(1) == "beat" else analysis["onsets"]
+        after: float = float(match.group(2))
+        following: List[float] = [t for t in times if t > after]
+        if not following:
+            print(f"No {match.group(1)} after {after}s.")
+            sys.exit(1)
+        return following[0]
+    print(f"Unrecognised cue '{expr}'. Use seconds, 'beat N', 'onset N' or 'next onset after Ts'.")
+    sys.exit(1)
+
+
+def analyze_command(args) -> None:
+    """Print the tempo, beat grid and onsets of an audio file."""
+    analysis: Dict[str, Any] = analyze_audio(args.input)
+    print(f"Duration: {analysis['duration']:.2f}s")
+    print(f"Tempo: {analysis['bpm']} BPM ({len(analysis['beats'])} beats)")
+    print(f"Onsets: {len(analysis['onsets'])}")
+    limit: int = args.show if args.show is not None else 16
+    for n, t in enumerate(analysis["beats"][:limit], start=1):
+        print(f"  beat {n}: {t:.3f}s")
+    for n, t in enumerate(analysis["onsets"][:limit], start=1):
+        print(f"  onset {n}: {t:.3f}s")
@@ -0,0 +1,169 @@
+import contextlib
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from typing import List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the in-process PCM engine
+    np = None
+
+from constants import DEFAULT_PCM_CACHE_MB
+from utils.cache import cache_dir, cached_file, evict_lru, file_identity, hash_key
+from utils.ffmpeg_utils import collect_command, run_command, start_command
+
+PCM_SAMPLE_RATE = 48000
+PCM_CHANNELS = 2
+
+
+def _require_numpy() -> None:
+    if np is None:
+        print("Error: the numpy audio engine requires numpy (pip install numpy).")
+        sys.exit(1)
+
+
+def decode_pcm(input_file: str, sample_rate: int = PCM_SAMPLE_RATE, channels: int = PCM_CHANNELS):
+    """
+    Decode the first audio stream to a float32 (frames, channels) array.
+    The decoded PCM is cached on disk and memory-mapped on later calls, so repeat edits skip decoding.
+    The cache is trimmed to DEFAULT_PCM_CACHE_MB after each new decode, least recently used first.
+    """
+    _require_numpy()
+    key: str = hash_key(file_identity(input_file), sample_rate, channels)
+    pcm_file: Optional[str] = cached_file("pcm", key, ".f32")
+    decoded: bool = pcm_file is None
+    if pcm_file is None:
+        directory: str = cache_dir("pcm")
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        os.close(fd)
+        cmd: List[str] = [
+            "ffmpeg", "-v", "error", "-i", input_file, "-vn", "-map", "0:a:0",
+            "-f", "f32le", "-ac", str(channels), "-ar", str(sample_rate), "-y", tmp_path
+        ]
+        try:
+            run_command(cmd, stage="decode_pcm")
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        pcm_file = os.path.join(directory, f"{key}.f32")
+        os.replace(tmp_path, pcm_file)
+    if os.path.getsize(pcm_file) == 0:
+        buf = np.zeros((0, channels), dtype=np.float32)
+    else:
+        buf = np.memmap(pcm_file, dtype=np.float32, mode="r").reshape(-1, channels)
+    if decoded:
+        # After mapping: an evicted file stays readable through the open mapping.
+        evict_lru("pcm", DEFAULT_PCM_CACHE_MB * 1024 * 1024)
+    return buf
+
+
+def silence(seconds: float, sample_rate: int = PCM_SAMPLE_RATE, channels: int = PCM_CHANNELS):
+    _require_numpy()
+    return np.zeros((int(round(seconds * sample_rate)), channels), dtype=np.float32)
+
+
+def cut(buf, start: float, end: Optional[float], sample_rate: int = PCM_SAMPLE_RATE):
+    """Slice [start, end) seconds out of a buffer (end None means to the end)."""
+    a: int = int(round(start * sample_rate))
+    b: Optional[int] = int(round(end * sample_rate)) if end is not None else None
+    return buf[a:b]
+
+
+def _fade_angles(fade_samples: int):
+    """Quarter-period angles sampled at sample midpoints, as a column for broadcasting over channels."""
+    return ((np.arange(fade_samples, dtype=np.float32) + 0.5) / fade_samples * (np.pi / 2))[:, None]
+
+
+def equal_power_crossfade(a, b, fade_samples: int):
+    """Join a and b, overlapping the last fade_samples of a with the first of b at constant power."""
+    fade_samples = min(fade_samples, len(a), len(b))
+    if fade_samples <= 0:
+        return np.concatenate([a, b])
+    t = _fade_angles(fade_samples)
+    overlap = a[-fade_samples:] * np.cos(t) + b[:fade_samples] * np.sin(t)
+    return np.concatenate([a[:-fade_samples], overlap, b[fade_samples:]])
+
+
+def loop(segment, total_seconds: float, crossfade_seconds: float = 0.0, sample_rate: int = PCM_SAMPLE_RATE):
+    """
+    Repeat a segment until total_seconds, crossfading each join with an equal-power curve.
+    A zero crossfade is a plain sample-accurate tile.
+    """
+    total: int = int(round(total_seconds * sample_rate))
+    if len(segment) == 0:
+        return np.zeros((total, segment.shape[1]), dtype=np.float32)
+    # A join can overlap at most half the segment; a one-sample segment cannot crossfade at all.
+    fade: int = min(int(round(crossfade_seconds * sample_rate)), len(segment) // 2)
+    if fade <= 0:
+        reps: int = -(-total // len(segment))
+        return np.tile(segment, (reps, 1))[:total]
+    t = _fade_angles(fade)
+    # Each repeat after the first starts with its fade-in already blended into the previous tail.
+    body = segment[fade:-fade]
+    join = segment[-fade:] * np.cos(t) + segment[:fade] * np.sin(t)
+    unit = np.concatenate([body, join])
+    reps = -(-max(0, total - fade) // len(unit))
+    out = np.concatenate([segment[:fade]] + [unit] * max(1, reps))
+    return out[:total]
+
+
+def mix(base, cues: List[Tuple[float, object, float, float]], sample_rate: int = PCM_SAMPLE_RATE):
+    """
+    Sum delayed cues into a copy of base at unity gain (no amix-style rescaling).
+    Each cue is (offset seconds, buffer, linear gain, fade seconds); cues past the end of base are truncated.
+    Fades are equal-power, applied to the slice being summed so the cue buffer is never copied whole.
+    """
+    out = np.array(base, dtype=np.float32, copy=True)
+    for offset, buf, gain, fade_seconds in cues:
+        a: int = int(round(offset * sample_rate))
+        if a >= len(out):
+            continue
+        n: int = min(len(buf), len(out) - a)
+        part = buf[:n] * np.float32(gain)
+        fade: int = min(int(round(fade_seconds * sample_rate)), len(buf) // 2)
+        if fade > 0:
+            t = _fade_angles(fade)
+            head: int = min(fade, n)
+            part[:head] *= np.sin(t[:head])
+            # The fade-out sits at the end of the whole cue, which truncation may cut off.
+            tail_start: int = len(buf) - fade
+            if tail_start < n:
+                part[tail_start:n] *= np.cos(t[:n - tail_start])
+        out[a:a + n] += part
+    return out
+
+
+def encode_pcm(buf, output_file: str, video_input: Optional[str] = None, extra_args: Optional[List[str]] = None,
+               sample_rate: int = PCM_SAMPLE_RATE) -> None:
+    """Stream a float32 buffer into a single ffmpeg encode, optionally muxed with the video of video_input."""
+    _require_numpy()
+    channels: int = buf.shape[1]
+    cmd: List[str] = ["ffmpeg", "-y", "-v", "error"]
+    if video_input is not None:
+        cmd += ["-i", video_input]
+    cmd += ["-f", "f32le", "-ar", str(sample_rate), "-ac", str(channels), "-i", "pipe:0"]
+    if video_input is not None:
+        cmd += ["-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", "aac"]
+    cmd += (extra_args or []) + [output_file]
+    data = np.ascontiguousarray(np.clip(buf, -1.0, 1.0), dtype=np.float32)
+    proc, cmd, stage = start_command(cmd, "encode_pcm", stdin=subprocess.PIPE)
+
+    def feed() -> None:
+        # Fed from a thread while collect_command drains the progress pipe, so neither side blocks the
+        # other. The pipes are text-mode; the samples go to the binary buffer underneath. If ffmpeg
+        # exits early the write fails and collect_command reports its exit status instead.
+        with contextlib.suppress(BrokenPipeError):
+            try:
+                proc.stdin.buffer.write(memoryview(data).cast("B"))
+            finally:
+                proc.stdin.close()
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    try:
+        collect_command(proc, cmd, stage)
+    finally:
+        writer.join()
@@ -0,0 +1,102 @@
+import re
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+from constants import DEFAULT_PREFLIGHT_SECONDS, DEFAULT_PREFLIGHT_TIMEOUT
+from utils.ffmpeg_utils import FFmpegError, run_command
+
+_GRAPH_FLAGS = ("-filter_complex", "-vf", "-af")
+# ffmpeg names graph nodes Parsed_<filter>_<position in the graph string>.
+_PARSED_NODE = re.compile(r"\[Parsed_(\w+?)_(\d+) @ [^]]+\]\s*(.*)")
+_FILTER_WITH_ARGS = re.compile(r"filter '([\w-]+)' with args '(.*)'")
+_NO_SUCH_FILTER = re.compile(r"No such filter: '([^']*)'")
+
+
+def split_graph(graph: str) -> List[Tuple[int, str]]:
+    """
+    Split a filtergraph into its nodes as (chain index, "name=args") in ffmpeg's parse order,
+    honouring quotes and backslash escapes, with link labels stripped.
+    """
+    nodes: List[Tuple[int, str]] = []
+    chain, current, quoted, escaped = 0, "", False, False
+    for ch in graph + ";":
+        if escaped:
+            current, escaped = current + ch, False
+        elif ch == "\\":
+            current, escaped = current + ch, True
+        elif ch == "'":
+            current, quoted = current + ch, not quoted
+        elif ch in ",;" and not quoted:
+            text: str = re.sub(r"^\s*(\[[^]]*\]\s*)*|(\s*\[[^]]*\])*\s*$", "", current)
+            if text:
+                nodes.append((chain, text))
+            current = ""
+            if ch == ";":
+                chain += 1
+        else:
+            current += ch
+    return nodes
+
+
+def _locate(nodes: List[Tuple[int, str]], stderr: str) -> Optional[Tuple[int, int, str]]:
+    """Find the node an ffmpeg error refers to, as (node index, chain index, text)."""
+    for line in stderr.splitlines():
+        match = _PARSED_NODE.search(line)
+        if match and int(match.group(2)) < len(nodes):
+            idx = int(match.group(2))
+            if nodes[idx][1].split("=", 1)[0] == match.group(1):
+                return idx, nodes[idx][0], nodes[idx][1]
+        match = _FILTER_WITH_ARGS.search(line) or _NO_SUCH_FILTER.search(line)
+        if match:
+            wanted: str = "=".join(g for g in match.groups() if g)
+            # Prefer the exact node text, else the first node using that filter.
+            for exact in (True, False):
+                for idx, (chain, text) in enumerate(nodes):
+                    if text == wanted if exact else text.split("=", 1)[0] == match.group(1):
+                        return idx, chain, text
+    return None
+
+
+def describe_failure(graphs: List[str], stderr: str) -> str:
+    """Turn ffmpeg's stderr for a failed graph into a short report naming the failing node."""
+    errors: List[str] = [line.strip() for line in stderr.splitlines() if line.strip()]
+    report: List[str] = [errors[0] if errors else "ffmpeg failed without output"]
+    for graph in graphs:
+        found = _locate(split_graph(graph), stderr)
+        if found is not None:
+            idx, chain, text = found
+            report.append(f"  at node {idx} (chain {chain}): {text}")
+            break
+    report += [f"  {line}" for line in errors[1:5]]
+    return "\n".join(report)
+
+
+def preflight(input_args: List[str], graph_args: List[str], stage: str) -> None:
+    """
+    Validate a compiled graph before the real encode: run it on the first fraction of a second of
+    every input into the null muxer. Filter names, options and expressions are all checked when
+    ffmpeg configures the graph, so a bad node fails here in well under a second.
+    Raises FFmpegError after printing the failing node.
+    """
+    sample_inputs: List[str] = []
+    for arg in input_args:
+        if arg == "-i":
+            # Limit each input at demux time so even lavfi sources end immediately.
+            sample_inputs += ["-t", str(DEFAULT_PREFLIGHT_SECONDS)]
+        sample_inputs.append(arg)
+    cmd: List[str] = (["ffmpeg", "-hide_banner", "-nostdin", "-v", "error"] + sample_inputs + graph_args
+                      + ["-f", "null", "-"])
+    graphs: List[str] = [graph_args[i + 1] for i, arg in enumerate(graph_args[:-1]) if arg in _GRAPH_FLAGS]
+    started: float = time.monotonic()
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as log:
+        try:
+            run_command(cmd, stage=f"{stage}:preflight", stderr=log, timeout=DEFAULT_PREFLIGHT_TIMEOUT)
+        except FFmpegError as e:
+            if e.stage.endswith(":timeout"):
+                print(f"Preflight ({stage}): no verdict within {DEFAULT_PREFLIGHT_TIMEOUT}s, continuing")
+                return
+            log.seek(0)
+            print(f"Preflight ({stage}) failed: {describe_failure(graphs, log.read())}")
+            raise
+    print(f"Preflight ({stage}): graph OK ({time.monotonic() - started:.2f}s)")
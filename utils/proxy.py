@@ -0,0 +1,60 @@
+import os
+import tempfile
+from typing import List, Optional, Tuple
+
+from constants import DEFAULT_PROXY_HEIGHT, DEFAULT_PROXY_CACHE_MB
+from utils.cache import cache_dir, cached_file, evict_lru, file_identity, hash_key
+from utils.ffmpeg_utils import run_command
+from utils.metadata import probe, StreamInfo
+
+
+def proxy_scale(input_file: str, height: int = DEFAULT_PROXY_HEIGHT) -> float:
+    """
+    Factor from source pixels to proxy pixels (1.0 when the source is already that small).
+    ffmpeg autorotates before scale=-2:{height}, so this uses the displayed height, not the coded one.
+    """
+    video: Optional[StreamInfo] = probe(input_file).video
+    display_height: Optional[int] = video.display_size[1] if video is not None else None
+    if not display_height or display_height <= height:
+        return 1.0
+    return height / display_height
+
+
+def build_proxy(input_file: str, height: int = DEFAULT_PROXY_HEIGHT) -> Tuple[str, float]:
+    """
+    Return (proxy path, scale) for a low-resolution, all-intra H.264 copy of input_file.
+    Proxies are built once and cached by path/size/mtime, so every preview after the first
+    decodes a few hundred lines per frame and can seek to any frame without a GOP walk.
+    The cache is kept to DEFAULT_PROXY_CACHE_MB, least recently used first.
+    """
+    scale: float = proxy_scale(input_file, height)
+    if scale == 1.0:
+        print(f"Proxy: {input_file} is already {height}p or smaller, using it directly")
+        return input_file, 1.0
+    key: str = hash_key(file_identity(input_file), height)
+    hit: Optional[str] = cached_file("proxy", key, ".mp4")
+    if hit is not None:
+        print(f"Proxy: cache hit for {input_file}")
+        return hit, scale
+
+    # Trim older proxies before adding one; the new proxy is in use by the caller once returned.
+    evict_lru("proxy", DEFAULT_PROXY_CACHE_MB * 1024 * 1024)
+    directory: str = cache_dir("proxy")
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".mp4")
+    os.close(fd)
+    cmd: List[str] = [
+        "ffmpeg", "-y", "-i", input_file,
+        "-vf", f"scale=-2:{height}",
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-g", "1", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "128k",
+        tmp_path
+    ]
+    print(f"Proxy: building {height}p proxy of {input_file}")
+    try:
+        run_command(cmd, stage="proxy")
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    path: str = os.path.join(directory, f"{key}.mp4")
+    os.replace(tmp_path, path)
+    return path, scale
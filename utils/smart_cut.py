@@ -0,0 +1,157 @@
+import bisect
+import os
+import sys
+import tempfile
+from typing import List, Optional, Tuple
+
+from utils.ffmpeg_utils import FFmpegError, run_command
+from utils.metadata import probe, get_keyframe_times, MediaInfo, StreamInfo
+
+# Encoders used to re-create the partial GOPs at cut edges so the pieces concat cleanly with copied packets.
+ENCODER_FOR_CODEC = {
+    "h264": "libx264",
+    "hevc": "libx265",
+    "vp9": "libvpx-vp9",
+    "av1": "libaom-av1",
+}
+# ffprobe profile names -> encoder -profile:v values.
+PROFILE_FOR_ENCODER = {
+    "libx264": {"Constrained Baseline": "baseline", "Baseline": "baseline", "Main": "main", "High": "high",
+                "High 10": "high10", "High 4:2:2": "high422", "High 4:4:4 Predictive": "high444"},
+    "libx265": {"Main": "main", "Main 10": "main10", "Main Still Picture": "mainstillpicture"},
+}
+# Codecs whose parameter sets live in container extradata; their pieces are written as MPEG-TS
+# (Annex B, headers repeated in-band at every keyframe) so the concat demuxer never has to carry
+# more than one piece's extradata.
+ANNEXB_BSF = {"h264": "h264_mp4toannexb", "hevc": "hevc_mp4toannexb"}
+
+
+def plan_smart_cut(keyframes: List[float], start: float, end: float) -> List[Tuple[float, float, bool]]:
+    """
+    Split [start, end) into (from, to, copy) pieces.
+    The middle, from the first keyframe at or after start to the last keyframe at or before end,
+    is stream-copied; the partial GOPs on either side are re-encoded.
+    """
+    i: int = bisect.bisect_left(keyframes, start)
+    j: int = bisect.bisect_right(keyframes, end) - 1
+    if i >= len(keyframes) or j < i or keyframes[i] >= keyframes[j]:
+        return [(start, end, False)]
+    k_in: float = keyframes[i]
+    k_out: float = keyframes[j]
+    pieces: List[Tuple[float, float, bool]] = []
+    if k_in > start:
+        pieces.append((start, k_in, False))
+    pieces.append((k_in, k_out, True))
+    if end > k_out:
+        pieces.append((k_out, end, False))
+    return pieces
+
+
+def encode_args_for(video: StreamInfo) -> List[str]:
+    """
+    Encoder arguments that reproduce the source stream's codec, profile, level, pixel format and
+    colour parameters, with parameter sets repeated in-band so re-encoded pieces can sit next to
+    stream-copied ones.
+    """
+    encoder: str = ENCODER_FOR_CODEC.get(video.codec_name or "") or "libx265"
+    args: List[str] = ["-c:v", encoder]
+    if video.pix_fmt:
+        args += ["-pix_fmt", video.pix_fmt]
+    profile: Optional[str] = PROFILE_FOR_ENCODER.get(encoder, {}).get(video.profile or "")
+    if profile is not None:
+        args += ["-profile:v", profile]
+    level: Optional[int] = video.level if video.level is not None and video.level > 0 else None
+    if encoder == "libx264":
+        args += ["-x264-params", "repeat-headers=1" + (f":level={level}" if level is not None else "")]
+    elif encoder == "libx265":
+        # HEVC signals level_idc as 30 x level; x265 takes the level itself.
+        args += ["-x265-params", "repeat-headers=1" + (f":level-idc={level / 30:.1f}" if level is not None else "")]
+    for flag, value in (("-color_range", video.color_range), ("-colorspace", video.color_space),
+                        ("-color_primaries", video.color_primaries), ("-color_trc", video.color_transfer)):
+        if value and value != "unknown":
+            args += [flag, value]
+    return args
+
+
+def copy_args_for(video: StreamInfo) -> List[str]:
+    """Stream-copy arguments; H.264/HEVC packets are converted to Annex B with in-band parameter sets."""
+    bsf: Optional[str] = ANNEXB_BSF.get(video.codec_name or "")
+    return ["-c:v", "copy"] + (["-bsf:v", bsf] if bsf is not None else [])
+
+
+def piece_suffix(video: StreamInfo) -> str:
+    """Container for intermediate pieces: MPEG-TS for Annex B codecs, Matroska otherwise."""
+    return ".ts" if video.codec_name in ANNEXB_BSF else ".mkv"
+
+
+def verify_decode(path: str, stage: str) -> bool:
+    """Decode a joined file end to end; False if ffmpeg reports any decode error."""
+    try:
+        run_command(["ffmpeg", "-v", "error", "-xerror", "-i", path, "-map", "0:v", "-f", "null", "-"],
+                    stage=f"{stage}:verify")
+    except FFmpegError:
+        return False
+    return True
+
+
+def _full_reencode(input_file: str, start: float, end: float, output_file: str, video: StreamInfo) -> None:
+    cmd: List[str] = [
+        "ffmpeg", "-y",
+        "-ss", str(start),
+        "-i", input_file,
+        "-t", str(end - start),
+        "-map", "0:v:0", "-map", "0:a?"
+    ] + encode_args_for(video) + ["-c:a", "aac", output_file]
+    run_command(cmd, stage="smart_cut:fallback")
+
+
+def smart_cut(input_file: str, start: float, end: float, output_file: str) -> None:
+    """
+    Frame-accurate cut of [start, end) at near stream-copy speed.
+    Only the partial GOPs at each edge are re-encoded; the pieces are joined with the concat demuxer
+    and audio is cut separately from the source. The joined file is decoded once as a check and the
+    range is re-encoded in full if that fails.
+    """
+    info: MediaInfo = probe(input_file)
+    video: Optional[StreamInfo] = info.video
+    if video is None:
+        print(f"Error: {input_file} has no video stream to cut.")
+        sys.exit(1)
+    pieces: List[Tuple[float, float, bool]] = plan_smart_cut(get_keyframe_times(input_file), start, end)
+    print(f"Smart cut {start}s-{end}s: " +
+          ", ".join(f"{a:.3f}-{b:.3f} {'copy' if c else 'encode'}" for a, b, c in pieces))
+
+    with tempfile.TemporaryDirectory(prefix="ffmpeg_toy_cut_") as tmp_dir:
+        piece_files: List[str] = []
+        for n, (piece_start, piece_end, copy) in enumerate(pieces):
+            piece_file: str = os.path.join(tmp_dir, f"piece_{n}{piece_suffix(video)}")
+            cmd: List[str] = [
+                "ffmpeg", "-y",
+                "-ss", str(piece_start),
+                "-i", input_file,
+                "-t", str(piece_end - piece_start),
+                "-map", "0:v:0", "-an"
+            ]
+            cmd += copy_args_for(video) if copy else encode_args_for(video)
+            cmd.append(piece_file)
+            run_command(cmd, stage=f"smart_cut:piece{n}")
+            piece_files.append(piece_file)
+
+        concat_list_file: str = os.path.join(tmp_dir, "concat_list.txt")
+        with open(concat_list_file, "w", encoding="utf-8") as f:
+            for piece_file in piece_files:
+                f.write(f"file '{piece_file}'\n")
+
+        cmd = [
+            "ffmpeg", "-y",
+            "-f", "concat", "-safe", "0", "-i", concat_list_file,
+            "-ss", str(start), "-t", str(end - start), "-i", input_file,
+            "-map", "0:v", "-map", "1:a?",
+            "-c:v", "copy", "-c:a", "aac",
+            output_file
+        ]
+        run_command(cmd, stage="smart_cut:join")
+
+    if not verify_decode(output_file, "smart_cut"):
+        print("Smart cut output failed to decode cleanly; re-encoding the whole range instead.")
+        _full_reencode(input_file, start, end, output_file, video)
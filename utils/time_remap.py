@@ -0,0 +1,123 @@
+import math
+import sys
+from typing import Callable, List, Optional, Tuple
+
+# Knots sampled along the ramp; the setpts expression interpolates linearly between them.
+RAMP_KNOTS = 48
+# Integration sub-steps per knot interval when accumulating output time.
+_SUBSTEPS = 32
+
+RAMP_CURVES = ("linear", "exp")
+
+
+def parse_curve(curve: str) -> Tuple[str, List[Tuple[float, float]]]:
+    """
+    Parse a ramp curve: "linear", "exp", or custom knots "u:p,u:p,..." where u is the position
+    through the ramp (0..1) and p the progress from the start rate to the end rate (0..1).
+    """
+    if curve in RAMP_CURVES:
+        return curve, []
+    points: List[Tuple[float, float]] = []
+    try:
+        for knot in curve.split(","):
+            u, p = knot.split(":")
+            points.append((float(u), float(p)))
+    except ValueError:
+        print(f"Invalid ramp curve '{curve}': use linear, exp or knots like '0:0,0.7:0.2,1:1'.")
+        sys.exit(1)
+    points.sort()
+    if points[0][0] != 0.0 or points[-1][0] != 1.0:
+        print("Custom ramp curve must have knots at u=0 and u=1.")
+        sys.exit(1)
+    return "custom", points
+
+
+def _progress(kind: str, points: List[Tuple[float, float]]) -> Callable[[float], float]:
+    if kind != "custom":
+        return lambda u: u
+    def interp(u: float) -> float:
+        for (u0, p0), (u1, p1) in zip(points, points[1:]):
+            if u <= u1:
+                return p0 if u1 == u0 else p0 + (p1 - p0) * (u - u0) / (u1 - u0)
+        return points[-1][1]
+    return interp
+
+
+def _rate_fn(kind: str, points: List[Tuple[float, float]], start_rate: float, end_rate: float,
+             ramp_start: float, ramp_end: float) -> Callable[[float], float]:
+    """Playback rate (source seconds per output second) at source time t."""
+    progress = _progress(kind, points)
+
+    def rate(t: float) -> float:
+        u = 0.0 if t <= ramp_start else min(1.0, (t - ramp_start) / (ramp_end - ramp_start))
+        p = progress(u)
+        if kind == "exp":
+            return start_rate * (end_rate / start_rate) ** p
+        return start_rate + (end_rate - start_rate) * p
+    return rate
+
+
+def _integrate(rate: Callable[[float], float], t0: float, t1: float) -> float:
+    """Output seconds spent playing source [t0, t1] (midpoint rule over 1/rate)."""
+    step = (t1 - t0) / _SUBSTEPS
+    return sum(step / rate(t0 + (i + 0.5) * step) for i in range(_SUBSTEPS))
+
+
+def build_remap_table(seg_start: float, seg_end: float, audio_cue: float, cue_end: float, curve: str = "exp",
+                      ramp_seconds: Optional[float] = None) -> List[Tuple[float, float]]:
+    """
+    Source->output time mapping for a sync with a speed ramp, as (source_t, output_t) knots.
+
+    Source [0, seg_start] still lands on output [0, audio_cue], but instead of one constant stretch
+    the rate ramps over the last ramp_seconds (default: all of it) so that at seg_start it equals
+    the splice's rate; the splice [seg_start, seg_end] then plays at that rate up to cue_end.
+    The start rate is solved by bisection so the cue still lands exactly.
+    """
+    kind, points = parse_curve(curve)
+    end_rate: float = (seg_end - seg_start) / (cue_end - audio_cue)
+    ramp: float = seg_start if ramp_seconds is None else min(max(ramp_seconds, 1e-3), seg_start)
+    ramp_start: float = seg_start - ramp
+    knots: List[float] = [ramp_start + ramp * i / RAMP_KNOTS for i in range(RAMP_KNOTS + 1)]
+    if ramp_start > 0:
+        knots.insert(0, 0.0)
+
+    def duration(start_rate: float) -> float:
+        rate = _rate_fn(kind, points, start_rate, end_rate, ramp_start, seg_start)
+        return sum(_integrate(rate, a, b) for a, b in zip(knots, knots[1:]))
+
+    # Output duration falls monotonically as the start rate rises; bisect in log space.
+    lo, hi = math.log(1e-4), math.log(1e4)
+    for _ in range(60):
+        mid = (lo + hi) / 2
+        if duration(math.exp(mid)) > audio_cue:
+            lo = mid
+        else:
+            hi = mid
+    start_rate: float = math.exp((lo + hi) / 2)
+    print(f"Speed ramp ({kind}): {start_rate:.3f}x -> {end_rate:.3f}x over the last {ramp:.2f}s before the cue")
+
+    rate = _rate_fn(kind, points, start_rate, end_rate, ramp_start, seg_start)
+    table: List[Tuple[float, float]] = [(0.0, 0.0)]
+    out_t = 0.0
+    for a, b in zip(knots, knots[1:]):
+        out_t += _integrate(rate, a, b)
+        table.append((b, out_t))
+    # Absorb the residual bisection error so the cue lands exactly.
+    scale: float = audio_cue / out_t
+    table = [(s, o * scale) for s, o in table]
+    table.append((seg_end, cue_end))
+    return table
+
+
+def remap_expression(table: List[Tuple[float, float]]) -> str:
+    """
+    Flat setpts expression for a piecewise-linear remap table: output = o0 + sum(slope_i * clip(T - s_i, 0, len_i)).
+    No nesting and no per-segment trim branches; the result is in timebase units.
+    """
+    terms: List[str] = [f"{table[0][1]:.6f}"]
+    for (s0, o0), (s1, o1) in zip(table, table[1:]):
+        if s1 <= s0:
+            continue
+        slope = (o1 - o0) / (s1 - s0)
+        terms.append(f"{slope:.6f}*clip(T-{s0:.6f},0,{s1 - s0:.6f})")
+    return f"({'+'.join(terms)})/TB"